@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 
     'criteria',
     'profiles',
+    'standarts',
 ]
 
 
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'criteria.middleware.AuthenticationTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'application.urls'
@@ -63,7 +65,7 @@ REST_FRAMEWORK = {
         'criteria.authentication.OwnTokenAuthentication',
         'criteria.authentication.OwnBasicAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'criteria.pagination.DateModifiedPagination',
     'PAGE_SIZE': 100,
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 }
@@ -141,3 +143,26 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 PATH_TO_HTPASSWD_FILE = os.path.join(BASE_DIR, 'auth.htpasswd')
+# keyed digests of tokens for finding token owner without checking
+# passwords of all users (see index_token management command)
+PATH_TO_TOKEN_INDEX_FILE = os.path.join(BASE_DIR, 'auth.tokens')
+# token index is disabled until the secret is set
+TOKEN_INDEX_SECRET = os.getenv('TOKEN_INDEX_SECRET')
+# credential files are checked for changes not more often than once
+# per this number of seconds
+CREDENTIALS_CHECK_INTERVAL = 1
+# maximum number of verified credentials kept in cache,
+# least recently used ones are evicted
+CREDENTIALS_CACHE_SIZE = 1024
+# successfully verified credentials are cached for this number of seconds
+CREDENTIALS_CACHE_TTL = 60
+
+# changes feed (feed=changes) returns only objects modified earlier than
+# this number of seconds ago, it must exceed duration of the longest
+# writing transaction
+CHANGES_FEED_DELAY = int(os.getenv('CHANGES_FEED_DELAY', 60))
+
+# Directory with classifier reference files and interval in seconds
+# of checking them for changes (0 disables reloading)
+STANDARTS_DIR = os.getenv('STANDARTS_DIR', os.path.join(BASE_DIR, 'standarts'))
+STANDARTS_RELOAD_INTERVAL = int(os.getenv('STANDARTS_RELOAD_INTERVAL', 60))
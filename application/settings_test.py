@@ -1,3 +1,6 @@
 from application.settings import *
 
 PATH_TO_HTPASSWD_FILE = os.path.join(BASE_DIR, 'test.htpasswd')
+PATH_TO_TOKEN_INDEX_FILE = os.path.join(BASE_DIR, 'test.tokens')
+TOKEN_INDEX_SECRET = 'test token index secret'
+CREDENTIALS_CHECK_INTERVAL = 0
@@ -20,4 +20,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/0/criteria/', include('criteria.urls')),
     path('api/0/profiles/', include('profiles.urls')),
+    path('api/0/classifiers/', include('standarts.urls')),
 ]
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'application.settings')
 
 application = get_wsgi_application()
+
+# loading classifier reference tables before serving first request
+from django.conf import settings  # noqa: E402
+from standarts.registry import registry  # noqa: E402
+
+registry.load()
+if settings.STANDARTS_RELOAD_INTERVAL:
+    registry.start_reloading(settings.STANDARTS_RELOAD_INTERVAL)
@@ -0,0 +1,127 @@
+"""
+Throughput of Basic and Token authentication against .htpasswd files
+with 1, 10, 100 and 1000 users, for valid and invalid credentials.
+
+Every case is measured with verified credentials cache disabled (cold)
+and enabled (warm); token cases are measured with and without token index.
+
+    python -m benchmarks.authentication
+"""
+import base64
+import os
+import shutil
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'application.settings')
+os.environ.setdefault('TOKEN_INDEX_SECRET', 'benchmark secret')
+django.setup()
+
+from django.test import RequestFactory, override_settings  # noqa: E402
+from passlib.apache import HtpasswdFile  # noqa: E402
+from rest_framework import exceptions  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+
+from criteria.authentication import (  # noqa: E402
+    OwnBasicAuthentication, OwnTokenAuthentication
+)
+from criteria.credentials import (  # noqa: E402
+    TokenIndex, get_token_index_key
+)
+
+
+USER_COUNTS = (1, 10, 100, 1000)
+MIN_DURATION = 0.5  # seconds spent in every case
+
+
+def create_credential_files(directory, users_count):
+    htpasswd_path = os.path.join(directory, f'{users_count}.htpasswd')
+    ht = HtpasswdFile(htpasswd_path, new=True)
+    for number in range(users_count):
+        ht.set_password(f'user{number}', f'password{number}')
+    ht.save()
+
+    token_index_path = os.path.join(directory, f'{users_count}.tokens')
+    token_index = TokenIndex(token_index_path, get_token_index_key())
+    for number in range(users_count):
+        username = f'user{number}'
+        token_index.set_token(
+            username, ht.get_hash(username).decode('ascii'),
+            f'password{number}'
+        )
+    token_index.save()
+    return htpasswd_path, token_index_path
+
+
+def get_request(authorization):
+    return Request(RequestFactory().get('/', HTTP_AUTHORIZATION=authorization))
+
+
+def measure(authentication, authorization):
+    """Returns authentications per second"""
+    request = get_request(authorization)
+    calls = 0
+    started_at = time.perf_counter()
+    while True:
+        try:
+            authentication.authenticate(request)
+        except exceptions.AuthenticationFailed:
+            pass
+        calls += 1
+        duration = time.perf_counter() - started_at
+        if duration >= MIN_DURATION:
+            return calls / duration
+
+
+def get_cases(users_count):
+    # the last user is the worst case for checking users one by one
+    username, password = f'user{users_count - 1}', f'password{users_count - 1}'
+    basic = base64.b64encode(f'{username}:{password}'.encode()).decode()
+    wrong_basic = base64.b64encode(f'{username}:wrong'.encode()).decode()
+    return (
+        ('basic valid', OwnBasicAuthentication(), f'Basic {basic}', False),
+        ('basic invalid', OwnBasicAuthentication(), f'Basic {wrong_basic}', False),
+        ('token valid', OwnTokenAuthentication(), f'Token {password}', False),
+        ('token invalid', OwnTokenAuthentication(), 'Token wrong', False),
+        ('token valid, index', OwnTokenAuthentication(), f'Token {password}', True),
+        ('token invalid, index', OwnTokenAuthentication(), 'Token wrong', True),
+    )
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        print(
+            f'{"users":>6}  {"case":<22}{"cold, req/s":>14}{"warm, req/s":>14}'
+        )
+        for users_count in USER_COUNTS:
+            htpasswd_path, token_index_path = create_credential_files(
+                directory, users_count
+            )
+            for name, authentication, authorization, indexed in get_cases(users_count):
+                results = []
+                for cache_ttl in (0, 60):
+                    with override_settings(
+                        PATH_TO_HTPASSWD_FILE=htpasswd_path,
+                        PATH_TO_TOKEN_INDEX_FILE=(
+                            token_index_path if indexed
+                            else os.path.join(directory, 'missing')
+                        ),
+                        CREDENTIALS_CACHE_TTL=cache_ttl,
+                        CREDENTIALS_CHECK_INTERVAL=0,
+                    ):
+                        # changing file modification time drops loaded credentials
+                        os.utime(htpasswd_path)
+                        results.append(measure(authentication, authorization))
+                print(
+                    f'{users_count:>6}  {name:<22}'
+                    f'{results[0]:>14.1f}{results[1]:>14.1f}'
+                )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Throughput of criteria import through single and bulk create endpoints.
+
+Requests are made by test client against the configured database
+in a transaction which is rolled back at the end.
+
+    python -m benchmarks.criteria_bulk_create [--items 1000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'application.settings')
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from passlib.apache import HtpasswdFile  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from standarts.registry import registry  # noqa: E402
+
+
+API_URL = '/api/0/criteria/'
+BATCH_SIZE = 1000
+
+CRITERIA = {
+    'name': 'Name',
+    'classification': {
+        'id': '92350000-9',
+        'scheme': 'ДК021',
+        'description': 'Послуги гральних закладів і тоталізаторів'
+    },
+    'dataType': 'number',
+    'unit': {'name': 'millilitre of water', 'code': 'WW'},
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def get_client(directory):
+    htpasswd_path = os.path.join(directory, '.htpasswd')
+    ht = HtpasswdFile(htpasswd_path, new=True)
+    ht.set_password('admin', 'adminpassword')
+    ht.save()
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token adminpassword')
+    return client, htpasswd_path
+
+
+def measure_single(client, items):
+    started_at = time.perf_counter()
+    for item in items:
+        response = client.post(API_URL, data=item, format='json')
+        assert response.status_code == 201, response.content
+    return len(items) / (time.perf_counter() - started_at)
+
+
+def measure_bulk(client, items):
+    started_at = time.perf_counter()
+    for start in range(0, len(items), BATCH_SIZE):
+        response = client.post(
+            f'{API_URL}bulk/', data=items[start:start + BATCH_SIZE],
+            format='json'
+        )
+        assert response.status_code == 201, response.content
+    return len(items) / (time.perf_counter() - started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=1000)
+    items = [
+        dict(CRITERIA, name=f'Name {number}')
+        for number in range(parser.parse_args().items)
+    ]
+    registry.load()
+
+    directory = tempfile.mkdtemp()
+    try:
+        client, htpasswd_path = get_client(directory)
+        with override_settings(PATH_TO_HTPASSWD_FILE=htpasswd_path):
+            with transaction.atomic():
+                single = measure_single(client, items)
+                bulk = measure_bulk(client, items)
+                raise Rollback
+    except Rollback:
+        pass
+    finally:
+        shutil.rmtree(directory)
+
+    print(f'{"endpoint":<12}{"criteria/s":>12}')
+    print(f'{"single":<12}{single:>12.1f}')
+    print(f'{"bulk":<12}{bulk:>12.1f}')
+    print(f'speedup {bulk / single:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
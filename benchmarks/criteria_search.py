@@ -0,0 +1,94 @@
+"""
+Substring filters of criteria listing over generated catalogue.
+
+Inserts generated criteria (a million by default) in a transaction
+which is rolled back at the end, and compares former `icontains`
+filters, which compare UPPER(column) and scan the whole table,
+with `ilike_contains` filters served by pg_trgm GIN indexes
+(created by migration criteria.0008_trigram_indexes).
+
+    python -m benchmarks.criteria_search [--rows 1000000]
+"""
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'application.settings')
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from criteria.models import Criteria  # noqa: E402
+
+
+GENERATE_CRITERIA = '''
+INSERT INTO criteria_criteria (
+    id, name, data_type, unit_code, unit_name,
+    classification_id, classification_description,
+    additional_classification_id, additional_classification_description,
+    additional_classification_scheme, date_modified, status
+)
+SELECT
+    md5(number::text)::uuid, 'Criteria ' || md5(number::text), 'number',
+    'U' || (number %% 1000), 'unit', lpad((number %% 99999999)::text, 8, '0') || '-1',
+    'classification', lpad((number * 7 %% 99999999)::text, 8, '0') || '-2',
+    'additional classification', 'ДК021',
+    now() - number * interval '1 second', 'active'
+FROM generate_series(1, %s) number
+'''
+
+CASES = (
+    ('name', 'name', '4c8a'),
+    ('additionalClassification_id', 'additional_classification_id', '4241'),
+    ('unit_code', 'unit_code', 'u99'),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+def measure(queryset, number=5):
+    """Returns best duration of query in milliseconds and its scan nodes"""
+    durations = []
+    for _ in range(number):
+        started_at = time.perf_counter()
+        list(queryset.values_list('id', flat=True))
+        durations.append((time.perf_counter() - started_at) * 1000)
+    plan = queryset.values_list('id', flat=True).explain().splitlines()
+    scans = [line.strip(' ->') for line in plan if 'Scan' in line]
+    return min(durations), ' / '.join(scans)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    rows = parser.parse_args().rows
+
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(GENERATE_CRITERIA, [rows])
+                cursor.execute('ANALYZE criteria_criteria')
+            print(f'Generated {rows} criteria')
+
+            print(f'{"filter":<30}{"before, ms":>12}{"after, ms":>12}')
+            for name, field, value in CASES:
+                before, before_plan = measure(
+                    Criteria.objects.filter(**{f'{field}__icontains': value})
+                )
+                after, after_plan = measure(
+                    Criteria.objects.filter(**{f'{field}__ilike_contains': value})
+                )
+                print(f'{name:<30}{before:>12.1f}{after:>12.1f}')
+                print(f'    before: {before_plan}')
+                print(f'    after:  {after_plan}')
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
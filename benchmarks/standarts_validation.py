@@ -0,0 +1,78 @@
+"""
+Per-object cost of classification and unit validation.
+
+Compares the former implementation, which read reference file and
+deep-copied data for every validated object, with validation over
+preloaded reference tables.
+
+    python -m benchmarks.standarts_validation
+"""
+import json
+import os
+import timeit
+from copy import deepcopy
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'application.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from standarts.registry import (  # noqa: E402
+    CLASSIFICATION_REFERENCE_MAPPING, UNIT_CODES_FILENAME, registry
+)
+from standarts.validators import (  # noqa: E402
+    validate_classification, validate_unit
+)
+
+
+CLASSIFICATIONS = (
+    {'id': '92350000-9', 'scheme': 'ДК021', 'description': 'foo'},
+    {'id': '11785', 'scheme': 'GMDN', 'description': 'Кишкові щипці'},
+)
+UNIT = {'name': 'foo', 'code': 'WW'}
+
+
+def legacy_validate_classification(data):
+    data = deepcopy(data)
+    filename = CLASSIFICATION_REFERENCE_MAPPING[data['scheme']]
+    with open(os.path.join(settings.STANDARTS_DIR, filename), 'r') as json_file:
+        data['description'] = json.loads(json_file.read())[data['id']]
+    return data
+
+
+def legacy_validate_unit(data):
+    data = deepcopy(data)
+    path = os.path.join(settings.STANDARTS_DIR, UNIT_CODES_FILENAME)
+    with open(path, 'r') as json_file:
+        data['name'] = json.loads(json_file.read())[data['code']]['name']
+    return data
+
+
+def measure(function, data, number):
+    seconds = min(timeit.repeat(lambda: function(data), number=number, repeat=3))
+    return seconds / number * 1e6
+
+
+def main():
+    registry.load()
+    cases = [
+        (f'classification {data["scheme"]}', data,
+         legacy_validate_classification, validate_classification)
+        for data in CLASSIFICATIONS
+    ]
+    cases.append(('unit', UNIT, legacy_validate_unit, validate_unit))
+
+    print(f'{"object":<22}{"before, us":>14}{"after, us":>14}{"speedup":>10}')
+    for name, data, before, after in cases:
+        before_cost = measure(before, data, number=5)
+        after_cost = measure(after, data, number=100000)
+        print(
+            f'{name:<22}{before_cost:>14.1f}{after_cost:>14.2f}'
+            f'{before_cost / after_cost:>9.0f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
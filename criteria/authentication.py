@@ -1,12 +1,13 @@
+import time
 from dataclasses import dataclass
 
-from django.conf import settings
-from passlib.apache import HtpasswdFile
 from rest_framework import exceptions
 from rest_framework.authentication import (
     BasicAuthentication, TokenAuthentication
 )
 
+from criteria.credentials import credential_store
+
 
 @dataclass
 class DummyUser:
@@ -15,31 +16,46 @@ class DummyUser:
     is_authenticated: bool = True
 
 
-class OwnBasicAuthentication(BasicAuthentication):
+class AuthenticationTimingMixin:
+    """
+    Adds time spent in authentication class to `auth_duration` attribute
+    of Django request (see criteria.middleware.AuthenticationTimingMiddleware)
+    """
+    def authenticate(self, request):
+        started_at = time.perf_counter()
+        try:
+            return super().authenticate(request)
+        finally:
+            django_request = getattr(request, '_request', request)
+            django_request.auth_duration = (
+                getattr(django_request, 'auth_duration', 0) +
+                time.perf_counter() - started_at
+            )
+
+
+class OwnBasicAuthentication(AuthenticationTimingMixin, BasicAuthentication):
     """
     Changed default HTTP Basic authentication against username/password.
     Usernames and passwords hashes are stored in .htpasswd file
     """
     def authenticate_credentials(self, userid, password, request=None):
-        ht = HtpasswdFile(settings.PATH_TO_HTPASSWD_FILE)
-        result = ht.check_password(userid, password)
-        usernames = ht.users()
+        credentials = credential_store.get_credentials()
+        result = credentials.check_basic(userid, password)
 
         if result is None:
             raise exceptions.AuthenticationFailed('Invalid username.')
         elif not result:
             raise exceptions.AuthenticationFailed('Invalid password.')
         else:
-            if userid == usernames[0]:
-                return (self.get_user('admin'), None)
-            else:
-                return (self.get_user(userid), None)
+            return (
+                self.get_user(credentials.get_api_username(userid)), None
+            )
 
     def get_user(self, username):
         return DummyUser(username=username)
 
 
-class OwnTokenAuthentication(TokenAuthentication):
+class OwnTokenAuthentication(AuthenticationTimingMixin, TokenAuthentication):
     """
     Token based authentication.
 
@@ -51,18 +67,12 @@ class OwnTokenAuthentication(TokenAuthentication):
     Usernames and passwords hashes are stored in .htpasswd file
     """
     def authenticate_credentials(self, key):
-        ht = HtpasswdFile(settings.PATH_TO_HTPASSWD_FILE)
-
-        usernames = ht.users()
-        for username in usernames:
-            check_result = ht.check_password(username, key)
-            if check_result:
-                if username == usernames[0]:
-                    return (self.get_user('admin'), key)
-                else:
-                    return (self.get_user(username), key)
-
-        raise exceptions.AuthenticationFailed('Invalid token.')
+        credentials = credential_store.get_credentials()
+        username = credentials.get_token_owner(key)
+
+        if username is None:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return (self.get_user(credentials.get_api_username(username)), key)
 
     def get_user(self, username):
         return DummyUser(username=username)
@@ -0,0 +1,268 @@
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from passlib.apache import HtpasswdFile
+
+
+# key of digests used only inside of process (e.g. cache keys)
+PROCESS_KEY = os.urandom(32)
+
+
+def get_keyed_digest(value, key=PROCESS_KEY):
+    """Keyed digest of secret value, safe to store and to use as lookup key"""
+    return hmac.new(key, value.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def get_token_index_key():
+    """Returns key of token index digests or None when index is disabled"""
+    secret = settings.TOKEN_INDEX_SECRET
+    return secret.encode('utf-8') if secret else None
+
+
+class TokenIndex:
+    """
+    Index of token digests stored next to .htpasswd file.
+    Each line of index file has "username:password hash:digest" format,
+    so user owning the token is found directly instead of checking
+    passwords of all users. Entries of users which password hash was
+    changed in .htpasswd since indexing are ignored.
+    The first line keeps digest of key, index made with other
+    TOKEN_INDEX_SECRET is not used at all
+    """
+    KEY_CHECK_PREFIX = '# key:'
+
+    def __init__(self, path, key, entries=None):
+        self.path = path
+        self.key = key
+        self.entries = entries or {}
+        self._index_usernames()
+
+    def _index_usernames(self):
+        self._usernames = {
+            digest: username
+            for username, (_, digest) in self.entries.items()
+        }
+
+    def get_key_check_line(self):
+        key_check = get_keyed_digest('token-index', self.key)
+        return f'{self.KEY_CHECK_PREFIX}{key_check}'
+
+    @classmethod
+    def load(cls, path, key):
+        """
+        Returns index stored in file or None if it does not exist
+        or was made with other key
+        """
+        if not os.path.exists(path):
+            return None
+        token_index = cls(path, key)
+        entries = {}
+        with open(path, 'r') as index_file:
+            key_check = index_file.readline().strip()
+            if key_check != token_index.get_key_check_line():
+                return None
+            for line in index_file:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    username, entry = line.split(':', 1)
+                    password_hash, digest = entry.rsplit(':', 1)
+                    entries[username] = (password_hash, digest)
+        token_index.entries = entries
+        token_index._index_usernames()
+        return token_index
+
+    def get_digest(self, token):
+        return get_keyed_digest(token, self.key)
+
+    def get_entry(self, token):
+        """Returns (username, password hash) of indexed token or None"""
+        username = self._usernames.get(self.get_digest(token))
+        if username is None:
+            return None
+        return username, self.entries[username][0]
+
+    def set_token(self, username, password_hash, token):
+        self.entries[username] = (password_hash, self.get_digest(token))
+        self._index_usernames()
+
+    def save(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as index_file:
+            index_file.write(f'{self.get_key_check_line()}\n')
+            for username, (password_hash, digest) in self.entries.items():
+                index_file.write(f'{username}:{password_hash}:{digest}\n')
+        os.replace(tmp_path, self.path)
+
+
+def get_file_signature(path):
+    """Returns values which change whenever file is rewritten"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (path, None)
+    return (path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class VerifiedCredentialCache:
+    """
+    Bounded LRU cache of successfully verified credentials.
+    Keys are keyed digests of credentials, values are usernames,
+    entries expire after ttl seconds
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                username, expires_at = self._entries[key]
+            except KeyError:
+                return None
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return username
+
+    def set(self, key, username):
+        if not self.max_size or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (username, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class Credentials:
+    """
+    Parsed .htpasswd file and token index together with cache of
+    credentials verified against them. Only successful verifications
+    are cached, failed ones always run the full password check
+    """
+    ADMIN_USERNAME = 'admin'
+
+    def __init__(self, htpasswd, token_index=None):
+        self.htpasswd = htpasswd
+        self.token_index = token_index
+        self.usernames = tuple(htpasswd.users())
+        # users which index entries match their current password hash
+        self.indexed_usernames = frozenset(
+            username
+            for username, (password_hash, _) in (
+                token_index.entries.items() if token_index else ()
+            )
+            if password_hash == self.get_password_hash(username)
+        )
+        self.verified = VerifiedCredentialCache(
+            settings.CREDENTIALS_CACHE_SIZE, settings.CREDENTIALS_CACHE_TTL
+        )
+
+    def check_password(self, username, password):
+        return self.htpasswd.check_password(username, password)
+
+    def get_password_hash(self, username):
+        password_hash = self.htpasswd.get_hash(username)
+        return password_hash.decode('ascii') if password_hash else None
+
+    def check_basic(self, username, password):
+        """Returns result of check_password, using cache for valid pairs"""
+        key = get_keyed_digest(f'basic:{username}:{password}')
+        if self.verified.get(key) == username:
+            return True
+        result = self.check_password(username, password)
+        if result:
+            self.verified.set(key, username)
+        return result
+
+    def get_token_owner(self, token):
+        """Returns username of token owner or None for invalid token"""
+        key = get_keyed_digest(f'token:{token}')
+        username = self.verified.get(key)
+        if username is not None:
+            return username
+        for username in self.get_token_candidates(token):
+            if self.check_password(username, token):
+                self.verified.set(key, username)
+                return username
+        return None
+
+    def get_api_username(self, username):
+        """The first user of .htpasswd file acts as admin"""
+        if self.usernames and username == self.usernames[0]:
+            return self.ADMIN_USERNAME
+        return username
+
+    def get_token_candidates(self, token):
+        """
+        Returns users whose password should be checked against token.
+        User found by token index is the only candidate, otherwise
+        all users without up to date index entry are checked one by one
+        """
+        if self.token_index is None:
+            return self.usernames
+        entry = self.token_index.get_entry(token)
+        if entry is not None and entry[0] in self.indexed_usernames:
+            return (entry[0], )
+        return tuple(
+            username for username in self.usernames
+            if username not in self.indexed_usernames
+        )
+
+
+class CredentialStore:
+    """
+    Process-wide cache of credentials shared by authentication classes.
+    Files are parsed again only when they are changed, and changes are
+    checked at most once per CREDENTIALS_CHECK_INTERVAL seconds
+    """
+    def __init__(self):
+        self._credentials = None
+        self._signature = None
+        self._checked_at = None
+        self._lock = Lock()
+
+    def _get_signature(self):
+        return (
+            get_file_signature(settings.PATH_TO_HTPASSWD_FILE),
+            get_file_signature(settings.PATH_TO_TOKEN_INDEX_FILE),
+        )
+
+    def _load(self):
+        key = get_token_index_key()
+        return Credentials(
+            HtpasswdFile(settings.PATH_TO_HTPASSWD_FILE),
+            TokenIndex.load(settings.PATH_TO_TOKEN_INDEX_FILE, key)
+            if key else None
+        )
+
+    def get_credentials(self):
+        now = time.monotonic()
+        checked_at = self._checked_at
+        if (
+            checked_at is not None and
+            now - checked_at < settings.CREDENTIALS_CHECK_INTERVAL
+        ):
+            return self._credentials
+
+        signature = self._get_signature()
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    # signature is stored after loading, so concurrent
+                    # requests never get credentials of partially read files
+                    self._credentials = self._load()
+                    self._signature = signature
+        self._checked_at = now
+        return self._credentials
+
+
+credential_store = CredentialStore()
@@ -0,0 +1,33 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from django_filters import rest_framework as filters
+
+
+SEARCH_WORD_REGEX = re.compile(r'\w+')
+SEARCH_CONFIG = 'simple'
+
+
+class FullTextSearchFilter(filters.CharFilter):
+    """
+    Full-text search over weighted tsvector column kept by database trigger.
+    Every word of the query is matched as prefix, so word forms are found
+    without language specific stemming. Found objects are annotated with
+    `relevance`, which is available for ordering: ordering=-relevance
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('field_name', 'search_vector')
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        words = SEARCH_WORD_REGEX.findall(value or '')
+        if not words:
+            return qs
+        query = SearchQuery(
+            ' & '.join(f'{word}:*' for word in words),
+            config=SEARCH_CONFIG, search_type='raw'
+        )
+        return qs.annotate(
+            relevance=SearchRank(F(self.field_name), query)
+        ).filter(**{self.field_name: query})
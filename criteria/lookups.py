@@ -0,0 +1,17 @@
+from django.db.models import CharField
+from django.db.models.lookups import IContains
+
+
+@CharField.register_lookup
+class ILikeContains(IContains):
+    """
+    Case-insensitive containment as `column ILIKE '%value%'`.
+    Unlike `icontains`, which compares UPPER(column), it is served
+    by pg_trgm GIN indexes built over the column itself
+    """
+    lookup_name = 'ilike_contains'
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs_sql} ILIKE {rhs_sql}', lhs_params + rhs_params
@@ -0,0 +1,42 @@
+from getpass import getpass
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from passlib.apache import HtpasswdFile
+
+from criteria.credentials import TokenIndex, get_token_index_key
+
+
+class Command(BaseCommand):
+    help = (
+        'Adds keyed digest of user token to token index, so token '
+        'authentication checks only password of this user'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--token', help='User token (password), asked if not passed'
+        )
+
+    def handle(self, *args, **options):
+        key = get_token_index_key()
+        if key is None:
+            raise CommandError(
+                'TOKEN_INDEX_SECRET is not set, token index is disabled.'
+            )
+        username = options['username']
+        token = options['token'] or getpass(f'Token for {username}: ')
+
+        ht = HtpasswdFile(settings.PATH_TO_HTPASSWD_FILE)
+        if not ht.check_password(username, token):
+            raise CommandError('Invalid username or token.')
+
+        path = settings.PATH_TO_TOKEN_INDEX_FILE
+        # index made with other secret is replaced
+        token_index = TokenIndex.load(path, key) or TokenIndex(path, key)
+        token_index.set_token(
+            username, ht.get_hash(username).decode('ascii'), token
+        )
+        token_index.save()
+        self.stdout.write(f'Token of {username} added to {path}')
@@ -0,0 +1,29 @@
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuthenticationTimingMiddleware:
+    """
+    Reports time spent in authentication classes for every request
+    in `Server-Timing` response header and in `criteria.middleware` log
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        duration = getattr(request, 'auth_duration', None)
+        if duration is not None:
+            duration_ms = duration * 1000
+            server_timing = f'auth;dur={duration_ms:.3f}'
+            if response.has_header('Server-Timing'):
+                server_timing = f'{response["Server-Timing"]}, {server_timing}'
+            response['Server-Timing'] = server_timing
+            logger.info(
+                'Authentication of %s %s took %.3f ms',
+                request.method, request.path, duration_ms
+            )
+        return response
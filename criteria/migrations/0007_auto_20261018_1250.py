@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('criteria', '0006_auto_20200210_1240'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='criteria',
+            index=models.Index(fields=['date_modified', 'id'], name='criteria_cr_date_mo_f0ea65_idx'),
+        ),
+    ]
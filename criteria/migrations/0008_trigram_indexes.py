@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:53
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('criteria', '0007_auto_20261018_1250'),
+    ]
+
+    operations = [
+        # fails on servers without pg_trgm (postgresql-contrib)
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='criteria',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='criteria_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='criteria',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['additional_classification_id'], name='criteria_add_class_id_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='criteria',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['unit_code'], name='criteria_unit_code_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
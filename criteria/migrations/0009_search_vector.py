@@ -0,0 +1,49 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:55
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+UPDATE_SEARCH_VECTOR = '''
+CREATE FUNCTION criteria_criteria_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.name_eng, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.classification_description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER criteria_criteria_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, name_eng, classification_description
+    ON criteria_criteria FOR EACH ROW EXECUTE PROCEDURE criteria_criteria_search_vector_update();
+
+UPDATE criteria_criteria SET name = name;
+'''
+
+DROP_SEARCH_VECTOR_UPDATE = '''
+DROP TRIGGER criteria_criteria_search_vector_update ON criteria_criteria;
+DROP FUNCTION criteria_criteria_search_vector_update();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('criteria', '0008_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='criteria',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='criteria',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='criteria_cr_search__14ad5d_gin'),
+        ),
+        migrations.RunSQL(UPDATE_SEARCH_VECTOR, DROP_SEARCH_VECTOR_UPDATE),
+    ]
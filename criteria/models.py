@@ -1,8 +1,11 @@
 import uuid
 
-from django.contrib.postgres.indexes import BrinIndex
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
+from criteria import lookups  # noqa: F401 registers ilike_contains lookup
+
 DATATYPE_CHOICES = (
     ('string', 'string'),
     ('boolean', 'boolean'),
@@ -39,10 +42,30 @@ class Criteria(models.Model):
         max_length=10, choices=STATUS_CHOICES, default=STATUS_CHOICES[0][0], db_index=True
     )
 
+    # weighted name, name_eng and classification_description,
+    # kept by database trigger (see migration 0009)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ('-date_modified', )
         indexes = (
             BrinIndex(fields=['date_modified']),
+            # keyset pagination, see criteria.pagination
+            models.Index(fields=['date_modified', 'id']),
+            GinIndex(fields=['search_vector']),
+            # columns searched with ilike_contains lookup
+            GinIndex(
+                fields=['name'], name='criteria_name_trgm',
+                opclasses=['gin_trgm_ops']
+            ),
+            GinIndex(
+                fields=['additional_classification_id'],
+                name='criteria_add_class_id_trgm', opclasses=['gin_trgm_ops']
+            ),
+            GinIndex(
+                fields=['unit_code'], name='criteria_unit_code_trgm',
+                opclasses=['gin_trgm_ops']
+            ),
         )
 
     def __str__(self):
@@ -89,6 +112,7 @@ class Criteria(models.Model):
 
     @additional_classification.setter
     def additional_classification(self, value):
+        value = value or {}
         self.additional_classification_id = value.get('id')
         self.additional_classification_scheme = value.get('scheme')
         self.additional_classification_description = value.get('description')
@@ -0,0 +1,153 @@
+import base64
+import binascii
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+OFFSET_MODE = 'offset'
+CURSOR_MODE = 'cursor'
+FEED_MODE = 'feed'
+
+FEED_CHANGES = 'changes'
+
+
+def encode_position(instance):
+    position = f'{instance.date_modified.isoformat()}|{instance.pk}'
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+
+def decode_position(cursor):
+    """Returns (date_modified, id) encoded in cursor, raises ValueError"""
+    try:
+        position = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    except (binascii.Error, UnicodeError):
+        raise ValueError(cursor)
+    date_modified, _, pk = position.partition('|')
+    date_modified = parse_datetime(date_modified)
+    if date_modified is None:
+        raise ValueError(cursor)
+    return date_modified, uuid.UUID(pk)
+
+
+class DateModifiedPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with two keyset modes over (date_modified, id),
+    in which every page starts right after the last object of previous one,
+    so pages cost the same at any depth and rows are not counted:
+
+    - `cursor` parameter (empty value for the first page) pages
+      from the most recently modified objects;
+    - `feed=changes` pages from the least recently modified objects,
+      `offset` parameter is a token from `next_page` of previous response.
+      Last page links to itself, so clients poll it for new changes.
+      Objects get date_modified before their transaction commits, so an
+      object may appear after objects modified later than it. Objects
+      modified within last CHANGES_FEED_DELAY seconds are not returned,
+      so the feed never moves past objects which are not committed yet
+    """
+    cursor_query_param = 'cursor'
+    feed_query_param = 'feed'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_mode(self, request):
+        if request.query_params.get(self.feed_query_param) == FEED_CHANGES:
+            return FEED_MODE
+        if self.cursor_query_param in request.query_params:
+            return CURSOR_MODE
+        return OFFSET_MODE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.mode = self.get_mode(request)
+        if self.mode == OFFSET_MODE:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.mode == FEED_MODE:
+            self.position = request.query_params.get(self.offset_query_param, '')
+            queryset = self.filter_after_position(
+                self.filter_settled(queryset), '>'
+            )
+        else:
+            self.position = request.query_params[self.cursor_query_param]
+            queryset = self.filter_after_position(queryset, '<')
+
+        page = list(queryset[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        self.page = page[:self.limit]
+        return self.page
+
+    def filter_settled(self, queryset):
+        """Skips objects which may still be written by open transactions"""
+        return queryset.filter(date_modified__lt=(
+            timezone.now() - timedelta(seconds=settings.CHANGES_FEED_DELAY)
+        ))
+
+    def filter_after_position(self, queryset, operator):
+        """Orders queryset by (date_modified, id) and skips passed objects"""
+        ordering = ('date_modified', 'pk') if operator == '>' else (
+            '-date_modified', '-pk'
+        )
+        queryset = queryset.order_by(*ordering)
+        if not self.position:
+            return queryset
+
+        try:
+            date_modified, pk = decode_position(self.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        table = queryset.model._meta.db_table
+        return queryset.extra(
+            where=[
+                f'("{table}"."date_modified", "{table}"."id") {operator} '
+                f'(%s::timestamptz, %s::uuid)'
+            ],
+            params=[date_modified, str(pk)]
+        )
+
+    def get_paginated_response(self, data):
+        if self.mode == OFFSET_MODE:
+            return super().get_paginated_response(data)
+        if self.mode == FEED_MODE:
+            return Response(OrderedDict([
+                ('next_page', self.get_next_page()),
+                ('results', data)
+            ]))
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
+
+    def get_next_position(self):
+        return encode_position(self.page[-1]) if self.page else self.position
+
+    def get_next_link(self):
+        if self.mode == OFFSET_MODE:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.get_next_position()
+        )
+
+    def get_next_page(self):
+        offset = self.get_next_position()
+        return OrderedDict([
+            ('offset', offset),
+            ('uri', replace_query_param(
+                self.request.build_absolute_uri(), self.offset_query_param,
+                offset
+            )),
+        ])
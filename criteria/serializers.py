@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from criteria.models import DATATYPE_CHOICES, Criteria
+from criteria.models import DATATYPE_CHOICES, STATUS_CHOICES, Criteria
 from standarts.serializers import (
-    ClassificationSerializer, AdditionalClassificationSerializer, 
-    UnitSerializer
+    BATCH_REFERENCE_CHECKS, ClassificationSerializer,
+    AdditionalClassificationSerializer, UnitSerializer
+)
+from standarts.validators import (
+    validate_classifiers_batch, validate_units_batch
 )
 
 
@@ -56,7 +59,7 @@ class CriteriaListSerializer(
 
     class Meta:
         model = Criteria
-        fields = '__all__'
+        exclude = ('search_vector', )
 
     def get_field_names(self, *args, **kwargs):
         all_fields = super().get_field_names(*args, **kwargs)
@@ -98,6 +101,100 @@ class CriteriaCreateSerializer(
         return Criteria.objects.create(**validated_data)
 
 
+class CriteriaBulkCreateListSerializer(serializers.ListSerializer):
+    """
+    Validates fields of every item, then checks classifications and units
+    of all items against reference tables at once, so every distinct
+    code is looked up once. Errors are collected for every item
+    """
+    CLASSIFICATION_FIELDS = (
+        ('classification', 'classification'),
+        ('additionalClassification', 'additional_classification'),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._context[BATCH_REFERENCE_CHECKS] = True
+
+    def to_internal_value(self, data):
+        items = []
+        errors = []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+            except ValidationError as exc:
+                items.append(None)
+                errors.append(exc.detail)
+            else:
+                errors.append({})
+
+        self.check_references(items, errors)
+        if any(errors):
+            raise ValidationError(errors)
+        return items
+
+    def check_references(self, items, errors):
+        valid_items = [
+            (position, item) for position, item in enumerate(items)
+            if item is not None
+        ]
+        classification_keys = set()
+        unit_codes = set()
+        for _, item in valid_items:
+            unit_codes.add(item['unit']['code'])
+            for _, source in self.CLASSIFICATION_FIELDS:
+                if item.get(source):
+                    classification_keys.add(
+                        (item[source]['scheme'], item[source]['id'])
+                    )
+        classifications = {
+            (result['scheme'], result['id']): result
+            for result in validate_classifiers_batch([
+                {'scheme': scheme, 'id': classification_id}
+                for scheme, classification_id in classification_keys
+            ])
+        }
+        units = {
+            result['code']: result
+            for result in validate_units_batch(list(unit_codes))
+        }
+
+        for position, item in valid_items:
+            item_errors = {}
+            for field_name, source in self.CLASSIFICATION_FIELDS:
+                classification = item.get(source)
+                if not classification:
+                    continue
+                result = classifications[
+                    (classification['scheme'], classification['id'])
+                ]
+                description = result.get(
+                    'description', classification['description']
+                )
+                if not result['valid']:
+                    item_errors[field_name] = serializers.as_serializer_error(
+                        ValidationError(result['errors'])
+                    )
+                elif description != classification['description']:
+                    item[source] = dict(
+                        classification, description=description
+                    )
+
+            result = units[item['unit']['code']]
+            if not result['valid']:
+                item_errors['unit'] = serializers.as_serializer_error(
+                    ValidationError(result['errors'])
+                )
+            elif result['name'] != item['unit']['name']:
+                item['unit'] = dict(item['unit'], name=result['name'])
+            errors[position] = item_errors
+
+
+class CriteriaBulkCreateSerializer(CriteriaCreateSerializer):
+    class Meta(CriteriaCreateSerializer.Meta):
+        list_serializer_class = CriteriaBulkCreateListSerializer
+
+
 class CriteriaDetailSerializer(
     serializers.ModelSerializer, MinMaxValueSerializer
 ):
@@ -166,3 +263,14 @@ class CriteriaEditSerializer(
                 )
 
         return super().validate(data)
+
+
+class CriteriaBulkStatusSerializer(serializers.Serializer):
+    """
+    Status to set and ids of Criteria to change,
+    Criteria are selected by query parameters when ids are not passed
+    """
+    status = serializers.ChoiceField(choices=STATUS_CHOICES)
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, allow_empty=False
+    )
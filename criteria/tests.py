@@ -1,12 +1,24 @@
 import base64
+import io
 import os
+import time
 from copy import deepcopy
+from datetime import timedelta
+from urllib.parse import urlparse
+from unittest import mock
 
 from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
 from passlib.apache import HtpasswdFile
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from criteria.credentials import CredentialStore, VerifiedCredentialCache
 from criteria.models import Criteria
 
 API_URL = '/api/0/criteria/'
@@ -184,6 +196,185 @@ class TestAuth(APITestCase):
             status.HTTP_403_FORBIDDEN
         )
 
+    def test_token_index(self):
+        admin_token, user_token = USER_CREDENTIALS.values()
+        call_command(
+            'index_token', 'admin', token=admin_token, stdout=io.StringIO()
+        )
+        self.addCleanup(os.remove, settings.PATH_TO_TOKEN_INDEX_FILE)
+        with self.assertRaises(CommandError):
+            call_command(
+                'index_token', 'user', token=admin_token, stdout=io.StringIO()
+            )
+
+        with mock.patch.object(
+            HtpasswdFile, 'check_password', autospec=True,
+            side_effect=HtpasswdFile.check_password
+        ) as check_password:
+            # indexed token is checked against its owner only
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {admin_token}')
+            self.assertEqual(
+                self.client.post(path=API_URL, data={}).status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+            self.assertEqual(check_password.call_count, 1)
+            self.assertEqual(check_password.call_args[0][1], 'admin')
+
+            # users missing in index are still checked one by one
+            check_password.reset_mock()
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {user_token}')
+            self.assertEqual(
+                self.client.post(path=API_URL, data={}).status_code,
+                status.HTTP_403_FORBIDDEN
+            )
+            self.assertEqual(check_password.call_count, 1)
+            self.assertEqual(check_password.call_args[0][1], 'user')
+
+            call_command(
+                'index_token', 'user', token=user_token, stdout=io.StringIO()
+            )
+            check_password.reset_mock()
+            self.client.credentials(HTTP_AUTHORIZATION='Token random_token')
+            self.assertEqual(
+                self.client.get(path=API_URL).status_code,
+                status.HTTP_401_UNAUTHORIZED
+            )
+            self.assertEqual(check_password.call_count, 0)
+
+    def test_token_index_stale_entries(self):
+        admin_token, user_token = USER_CREDENTIALS.values()
+        for username, token in USER_CREDENTIALS.items():
+            call_command(
+                'index_token', username, token=token, stdout=io.StringIO()
+            )
+        self.addCleanup(os.remove, settings.PATH_TO_TOKEN_INDEX_FILE)
+
+        def get_token_candidates(token):
+            return CredentialStore().get_credentials().get_token_candidates(
+                token
+            )
+
+        self.assertEqual(get_token_candidates(user_token), ('user', ))
+        self.assertEqual(get_token_candidates('random_token'), ())
+
+        # entry of user with changed password is ignored
+        ht = HtpasswdFile(settings.PATH_TO_HTPASSWD_FILE)
+        ht.set_password('user', 'newpassword')
+        ht.save()
+        self.assertEqual(get_token_candidates(user_token), ('user', ))
+        self.assertEqual(get_token_candidates('newpassword'), ('user', ))
+        self.assertEqual(
+            CredentialStore().get_credentials().get_token_owner('newpassword'),
+            'user'
+        )
+
+        # index made with other secret is not used
+        with self.settings(TOKEN_INDEX_SECRET='other secret'):
+            self.assertEqual(
+                get_token_candidates(admin_token), ('admin', 'user')
+            )
+        # and is disabled without secret
+        with self.settings(TOKEN_INDEX_SECRET=None):
+            self.assertEqual(
+                get_token_candidates(admin_token), ('admin', 'user')
+            )
+            with self.assertRaises(CommandError):
+                call_command(
+                    'index_token', 'admin', token=admin_token,
+                    stdout=io.StringIO()
+                )
+
+    def test_credential_store(self):
+        store = CredentialStore()
+        credentials = store.get_credentials()
+        self.assertIs(store.get_credentials(), credentials)
+        self.assertEqual(credentials.usernames, tuple(USER_CREDENTIALS))
+        self.assertEqual(credentials.get_api_username('admin'), 'admin')
+        self.assertEqual(credentials.get_api_username('user'), 'user')
+
+        ht = HtpasswdFile(settings.PATH_TO_HTPASSWD_FILE, new=True)
+        ht.set_password('root', 'rootpassword')
+        ht.set_password('admin', 'adminpassword')
+        ht.save()
+        credentials = store.get_credentials()
+        self.assertEqual(credentials.usernames, ('root', 'admin'))
+        self.assertEqual(credentials.get_api_username('root'), 'admin')
+        self.assertEqual(credentials.get_api_username('admin'), 'admin')
+        self.assertTrue(credentials.check_password('root', 'rootpassword'))
+        self.assertIsNone(credentials.check_password('user', 'userpassword'))
+
+    def test_verified_credentials_cache(self):
+        admin_token = USER_CREDENTIALS['admin']
+        basic_auth_header = base64.b64encode(
+            f'admin:{admin_token}'.encode('utf-8')
+        ).decode('utf-8')
+        wrong_basic_auth_header = base64.b64encode(
+            'admin:wrong_password'.encode('utf-8')
+        ).decode('utf-8')
+
+        with mock.patch.object(
+            HtpasswdFile, 'check_password', autospec=True,
+            side_effect=HtpasswdFile.check_password
+        ) as check_password:
+            for authorization in (
+                f'Token {admin_token}', f'Basic {basic_auth_header}'
+            ):
+                self.client.credentials(HTTP_AUTHORIZATION=authorization)
+                for _ in range(3):
+                    self.assertEqual(
+                        self.client.get(path=API_URL).status_code,
+                        status.HTTP_200_OK
+                    )
+                self.assertEqual(check_password.call_count, 1)
+                check_password.reset_mock()
+
+            # failed attempts are never cached
+            self.client.credentials(
+                HTTP_AUTHORIZATION=f'Basic {wrong_basic_auth_header}'
+            )
+            for _ in range(3):
+                self.assertEqual(
+                    self.client.get(path=API_URL).status_code,
+                    status.HTTP_401_UNAUTHORIZED
+                )
+            self.assertEqual(check_password.call_count, 3)
+            check_password.reset_mock()
+
+            # changing .htpasswd file drops cache
+            ht = HtpasswdFile(settings.PATH_TO_HTPASSWD_FILE)
+            ht.set_password('admin', 'new_password')
+            ht.save()
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {admin_token}')
+            self.assertEqual(
+                self.client.get(path=API_URL).status_code,
+                status.HTTP_401_UNAUTHORIZED
+            )
+
+    def test_verified_credential_cache_limits(self):
+        cache = VerifiedCredentialCache(max_size=2, ttl=60)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 'b')
+        self.assertEqual(cache.get('c'), 'c')
+
+        expired_at = time.monotonic() + 61
+        with mock.patch('time.monotonic', return_value=expired_at):
+            self.assertIsNone(cache.get('b'))
+
+    def test_authentication_server_timing(self):
+        response = self.client.get(path=API_URL)
+        self.assertRegex(response['Server-Timing'], r'^auth;dur=\d+\.\d{3}$')
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {USER_CREDENTIALS["user"]}'
+        )
+        with self.assertLogs('criteria.middleware', level='INFO') as logs:
+            response = self.client.get(path=API_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('auth;dur=', response['Server-Timing'])
+        self.assertIn(f'GET {API_URL}', logs.output[0])
+
 
 class CriteriaAPITestCase(APITestCase):
     def setUp(self):
@@ -364,6 +555,84 @@ class TestCriteriaCreating(CriteriaAPITestCase):
         self.assertEqual(criteria_obj.status, 'active')
         self.assertIsNotNone(criteria_obj.id)
 
+    def test_criteria_bulk_creating(self):
+        bulk_url = f'{API_URL}bulk/'
+        self.assertEqual(
+            self._post_json(path=bulk_url, data=self.valid_criteria_data_1).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+        invalid_data = deepcopy(self.valid_criteria_data_2)
+        invalid_data['classification']['id'] = 'foo'
+        post_response = self._post_json(
+            path=bulk_url, data=[self.valid_criteria_data_1, invalid_data]
+        )
+        self.assertEqual(post_response.status_code, status.HTTP_400_BAD_REQUEST)
+        results = post_response.json()['results']
+        self.assertEqual(results[0], {'valid': True})
+        self.assertFalse(results[1]['valid'])
+        self.assertIn('classification', results[1]['errors'])
+        self.assertEqual(Criteria.objects.count(), 0)
+
+        # reference data of all items is checked at once
+        # with the same errors as for single item
+        invalid_items = [
+            deepcopy(self.valid_full_criteria_data) for _ in range(3)
+        ]
+        invalid_items[0]['classification']['id'] = '11111111-1'
+        invalid_items[1]['unit']['code'] = 'FOO'
+        invalid_items[2]['additionalClassification']['scheme'] = 'FOO'
+        post_response = self._post_json(path=bulk_url, data=invalid_items)
+        self.assertEqual(
+            post_response.status_code, status.HTTP_400_BAD_REQUEST
+        )
+        results = post_response.json()['results']
+        for result, item in zip(results, invalid_items):
+            self.assertFalse(result['valid'])
+            self.assertEqual(
+                result['errors'],
+                self._post_json(path=API_URL, data=item).json()
+            )
+        self.assertEqual(Criteria.objects.count(), 0)
+
+        item = deepcopy(self.valid_full_criteria_data)
+        item['additionalClassification'] = None
+        item['classification']['description'] = 'foo'
+        post_response = self._post_json(path=bulk_url, data=[item])
+        self.assertEqual(post_response.status_code, status.HTTP_201_CREATED)
+        criteria = Criteria.objects.get(
+            id=post_response.json()['results'][0]['id']
+        )
+        self.assertIsNone(criteria.additional_classification)
+        self.assertEqual(
+            criteria.classification,
+            self.valid_criteria_data_1['classification']
+        )
+        criteria.delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            post_response = self._post_json(
+                path=bulk_url, data=list(self.valid_criteria_data)
+            )
+        self.assertEqual(post_response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries.captured_queries],
+            ['SAVEPOINT', 'INSERT', 'RELEASE']
+        )
+        results = post_response.json()['results']
+        self.assertEqual(
+            [Criteria.objects.get(id=result['id']).name for result in results],
+            [data['name'] for data in self.valid_criteria_data]
+        )
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {USER_CREDENTIALS["user"]}'
+        )
+        self.assertEqual(
+            self._post_json(path=bulk_url, data=list(self.valid_criteria_data)).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
     def test_successful_criteria_creation_output(self):
         criteria_data = self.valid_full_criteria_data
         post_response = self._post_json(path=API_URL, data=criteria_data)
@@ -475,6 +744,11 @@ class TestCriteriaListing(CriteriaAPITestCase):
         )
         self.assertEqual(len(filter_get_response.json()['results']), 0)
 
+        # substring filters are case-insensitive and match special characters literally
+        for name, count in (('tom na', 1), ('CUSTOM', 1), ('%', 0), ('c_s', 0)):
+            filter_get_response = self.client.get(path=API_URL, data={'name': name})
+            self.assertEqual(len(filter_get_response.json()['results']), count)
+
         filter_get_response = self.client.get(path=API_URL, data={'foo': 'bar'})
         self.assertEqual(
             filter_get_response.status_code, status.HTTP_200_OK
@@ -523,6 +797,153 @@ class TestCriteriaListing(CriteriaAPITestCase):
                 Criteria.objects.all().order_by(ordering)[0].id.hex
             )
 
+    def test_criteria_listing_cursor_pagination(self):
+        for _ in range(3):
+            for data in self.valid_criteria_data:
+                Criteria.objects.create(**api_criteria_data_to_model(data))
+        # equal date_modified values are ordered by id
+        Criteria.objects.filter(
+            id__in=Criteria.objects.all()[:3].values('id')
+        ).update(date_modified=Criteria.objects.first().date_modified)
+        expected_ids = [
+            criteria.id.hex
+            for criteria in Criteria.objects.order_by('-date_modified', '-id')
+        ]
+
+        ids = []
+        data = {'cursor': '', 'limit': 2}
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                get_response = self.client.get(path=API_URL, data=data)
+            self.assertEqual(get_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn('count', get_response.json())
+            ids.extend(criteria['id'] for criteria in get_response.json()['results'])
+            if not get_response.json()['next']:
+                break
+            data = QueryDict(urlparse(get_response.json()['next']).query)
+        self.assertEqual(ids, expected_ids)
+
+        get_response = self.client.get(path=API_URL, data={'cursor': 'foo'})
+        self.assertEqual(get_response.status_code, status.HTTP_404_NOT_FOUND)
+
+        get_response = self.client.get(path=API_URL, data={'limit': 2})
+        self.assertEqual(get_response.json()['count'], len(expected_ids))
+
+    def pass_changes_feed_delay(self):
+        """Moves modification dates back as if CHANGES_FEED_DELAY passed"""
+        Criteria.objects.update(date_modified=F('date_modified') - timedelta(
+            seconds=settings.CHANGES_FEED_DELAY
+        ))
+
+    def test_criteria_changes_feed(self):
+        for data in self.valid_criteria_data:
+            Criteria.objects.create(**api_criteria_data_to_model(data))
+        self.pass_changes_feed_delay()
+        expected_ids = [
+            criteria.id.hex
+            for criteria in Criteria.objects.order_by('date_modified', 'id')
+        ]
+
+        ids = []
+        data = {'feed': 'changes', 'limit': 2, 'status': 'all'}
+        for _ in range(3):
+            with CaptureQueriesContext(connection) as queries:
+                get_response = self.client.get(path=API_URL, data=data)
+            self.assertEqual(get_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(queries), 1)
+            ids.extend(criteria['id'] for criteria in get_response.json()['results'])
+            next_page = get_response.json()['next_page']
+            data = QueryDict(urlparse(next_page['uri']).query)
+            self.assertEqual(data['offset'], next_page['offset'])
+        self.assertEqual(ids, expected_ids)
+        self.assertEqual(get_response.json()['results'], [])
+
+        # changed criteria appears on the last page
+        criteria = Criteria.objects.order_by('date_modified').first()
+        criteria.status = 'retired'
+        criteria.save()
+        get_response = self.client.get(path=API_URL, data=data)
+        self.assertEqual(get_response.json()['results'], [])
+        self.pass_changes_feed_delay()
+        get_response = self.client.get(path=API_URL, data=data)
+        self.assertEqual(
+            [criteria['id'] for criteria in get_response.json()['results']],
+            [criteria.id.hex]
+        )
+        self.assertEqual(get_response.json()['results'][0]['status'], 'retired')
+
+    def test_criteria_changes_feed_out_of_order_commits(self):
+        later = Criteria.objects.create(
+            **api_criteria_data_to_model(self.valid_criteria_data[0])
+        )
+        data = {'feed': 'changes', 'status': 'all'}
+        get_response = self.client.get(path=API_URL, data=data)
+        # recent changes are not returned while earlier ones may be
+        # not committed yet
+        self.assertEqual(get_response.json()['results'], [])
+        data = QueryDict(
+            urlparse(get_response.json()['next_page']['uri']).query
+        )
+
+        # criteria got date_modified before the returned one,
+        # but its transaction committed after it
+        earlier = Criteria.objects.create(
+            **api_criteria_data_to_model(self.valid_criteria_data[1])
+        )
+        Criteria.objects.filter(pk=earlier.pk).update(
+            date_modified=later.date_modified - timedelta(milliseconds=1)
+        )
+        self.pass_changes_feed_delay()
+        get_response = self.client.get(path=API_URL, data=data)
+        self.assertEqual(
+            [criteria['id'] for criteria in get_response.json()['results']],
+            [earlier.id.hex, later.id.hex]
+        )
+
+    def test_criteria_full_text_search(self):
+        names = (
+            ('Water resistance', 'Водостійкість', 'Годинники'),
+            ('Case material', 'Матеріал корпусу', 'Водонепроникні годинники'),
+            ('Weight', 'Вага', 'Годинники'),
+        )
+        for name_eng, name, classification_description in names:
+            data = api_criteria_data_to_model(self.valid_criteria_data_1)
+            data.update(name=name, name_eng=name_eng)
+            data['classification'] = dict(
+                data['classification'], description=classification_description
+            )
+            Criteria.objects.create(**data)
+
+        def search(**params):
+            get_response = self.client.get(path=API_URL, data=params)
+            self.assertEqual(get_response.status_code, status.HTTP_200_OK)
+            return [criteria['name'] for criteria in get_response.json()['results']]
+
+        self.assertEqual(search(q='weigh'), ['Вага'])
+        self.assertEqual(search(q='case mat'), ['Матеріал корпусу'])
+        self.assertEqual(search(q='Матеріал'), ['Матеріал корпусу'])
+        self.assertEqual(search(q='wood'), [])
+        self.assertEqual(len(search(q='!!')), 3)
+        # match in name weighs more than match in classification description,
+        # so relevance order is opposite to default order by date_modified
+        self.assertEqual(
+            search(q='Водо'), ['Матеріал корпусу', 'Водостійкість']
+        )
+        self.assertEqual(
+            search(q='Водо', ordering='-relevance'),
+            ['Водостійкість', 'Матеріал корпусу']
+        )
+        self.assertEqual(
+            search(q='Водо', ordering='relevance'),
+            ['Матеріал корпусу', 'Водостійкість']
+        )
+
+        criteria = Criteria.objects.get(name='Вага')
+        criteria.name_eng = 'Mass'
+        criteria.save()
+        self.assertEqual(search(q='mass'), ['Вага'])
+
     def test_criteria_listing_opt_fields(self):
         for data in self.valid_criteria_data:
             Criteria.objects.create(**api_criteria_data_to_model(data))
@@ -628,3 +1049,86 @@ class TestCriteriaDetail(CriteriaAPITestCase):
         )
         criteria_obj = Criteria.objects.get()
         self.assertEqual(criteria_obj.status, 'retired')
+
+    def test_criteria_bulk_status_update(self):
+        bulk_url = f'{API_URL}bulk/status/'
+        criteria = [
+            Criteria.objects.create(**api_criteria_data_to_model(data))
+            for data in self.valid_criteria_data
+        ]
+        date_modified = Criteria.objects.get(pk=criteria[2].pk).date_modified
+
+        # whole table is never selected
+        for path in (bulk_url, f'{bulk_url}?name=', f'{bulk_url}?status=all'):
+            response = self._post_json(path=path, data={'status': 'retired'})
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+        response = self._post_json(
+            path=f'{bulk_url}?dateModified_from=foo',
+            data={'status': 'retired'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._post_json(
+            path=bulk_url, data={'status': 'foo', 'ids': [criteria[0].id.hex]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Criteria.objects.filter(status='retired').exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._post_json(path=bulk_url, data={
+                'status': 'retired', 'ids': [c.id.hex for c in criteria[:2]]
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # one set-based statement
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries.captured_queries],
+            ['UPDATE']
+        )
+        self.assertIn(' IN (SELECT ', queries.captured_queries[0]['sql'])
+        self.assertTrue(
+            queries.captured_queries[0]['sql'].endswith('RETURNING "id"')
+        )
+        self.assertEqual(
+            set(response.json()['results']), {c.id.hex for c in criteria[:2]}
+        )
+
+        response = self._post_json(
+            path=f'{bulk_url}?name=Name', data={'status': 'retired'}
+        )
+        self.assertEqual(response.json()['results'], [criteria[3].id.hex])
+        self.assertEqual(
+            list(Criteria.objects.filter(status='active').values_list(
+                'pk', flat=True
+            )),
+            [criteria[2].pk]
+        )
+        self.assertEqual(
+            Criteria.objects.get(pk=criteria[2].pk).date_modified,
+            date_modified
+        )
+        self.assertGreater(
+            Criteria.objects.get(pk=criteria[3].pk).date_modified,
+            date_modified
+        )
+
+        response = self._post_json(
+            path=f'{bulk_url}?q=Name&status=retired', data={'status': 'active'}
+        )
+        self.assertEqual(response.json()['results'], [criteria[3].id.hex])
+
+        # retired Criteria are selected without status query parameter
+        response = self._post_json(
+            path=f'{bulk_url}?unit_code=WW', data={'status': 'active'}
+        )
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertFalse(Criteria.objects.filter(status='retired').exists())
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {USER_CREDENTIALS["user"]}'
+        )
+        response = self._post_json(
+            path=bulk_url,
+            data={'status': 'retired', 'ids': [criteria[0].id.hex]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
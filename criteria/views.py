@@ -1,5 +1,11 @@
+from django.db import connection, transaction
+from django.utils import timezone
 from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
@@ -7,8 +13,10 @@ from rest_framework.response import Response
 from rest_framework import status, generics
 
 from criteria import serializers as criteria_serializers
+from criteria.filters import FullTextSearchFilter
 from criteria.models import Criteria, STATUS_CHOICES
 from criteria.permissions import IsAdminOrReadOnlyPermission
+from standarts.filters import ClassificationTreeFilter
 
 
 class CriteriaStatusFilter(filters.CharFilter):
@@ -23,12 +31,14 @@ class CriteriaStatusFilter(filters.CharFilter):
 
 
 class CriteriaFilter(filters.FilterSet):
-    name = filters.CharFilter(lookup_expr='icontains')
-    classification_id = filters.CharFilter(lookup_expr='icontains')
+    q = FullTextSearchFilter()
+    name = filters.CharFilter(lookup_expr='ilike_contains')
+    classification_id = ClassificationTreeFilter()
     additionalClassification_id = filters.CharFilter(
-        field_name='additional_classification_id', lookup_expr='icontains'
+        field_name='additional_classification_id',
+        lookup_expr='ilike_contains'
     )
-    unit_code = filters.CharFilter(lookup_expr='icontains')
+    unit_code = filters.CharFilter(lookup_expr='ilike_contains')
     status = CriteriaStatusFilter()
     dateModified_from = filters.IsoDateTimeFilter(
         field_name='date_modified', lookup_expr='gte'
@@ -46,9 +56,13 @@ class CriteriaFilter(filters.FilterSet):
 
 
 class CriteriaViewset(ModelViewSet):
+    BULK_CREATE_MAX_ITEMS = 1000
+
     SERIALIZERS_MAPPING = {
         'list': criteria_serializers.CriteriaListSerializer,
         'create': criteria_serializers.CriteriaCreateSerializer,
+        'bulk_create': criteria_serializers.CriteriaBulkCreateSerializer,
+        'bulk_set_status': criteria_serializers.CriteriaBulkStatusSerializer,
         'retrieve': criteria_serializers.CriteriaDetailSerializer,
         'partial_update': criteria_serializers.CriteriaEditSerializer,
     }
@@ -91,6 +105,113 @@ class CriteriaViewset(ModelViewSet):
 
         return obj
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Creates list of Criteria with one INSERT in one transaction.
+        Nothing is created when any item is invalid, response contains
+        result for every passed item: id of created Criteria or errors
+        """
+        data = request.data
+        if not isinstance(data, list) or not data:
+            return Response(
+                {'detail': 'Expected not empty list of items'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(data) > self.BULK_CREATE_MAX_ITEMS:
+            return Response(
+                {'detail': (
+                    f'Ensure there are no more than '
+                    f'{self.BULK_CREATE_MAX_ITEMS} items'
+                )},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = self.get_serializer(data=data, many=True)
+        if not serializer.is_valid():
+            return Response(
+                {'results': [
+                    {'valid': False, 'errors': errors} if errors else {'valid': True}
+                    for errors in serializer.errors
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            instances = Criteria.objects.bulk_create(
+                Criteria(**validated_data)
+                for validated_data in serializer.validated_data
+            )
+        return Response(
+            {'results': [
+                {'valid': True, 'id': instance.id.hex} for instance in instances
+            ]},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk/status')
+    def bulk_set_status(self, request):
+        """
+        Retires or reactivates Criteria passed by ids or selected by
+        query parameters (as in listing), response contains ids
+        of changed Criteria. Without `status` query parameter Criteria
+        are selected regardless of their status
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status']
+        ids = serializer.validated_data.get('ids')
+
+        if ids is not None:
+            queryset = self.get_queryset().filter(pk__in=ids)
+        else:
+            queryset = self.get_bulk_filterset(request).qs
+        changed_ids = self.update_status(
+            queryset.exclude(status=new_status), new_status
+        )
+        return Response({'results': [pk.hex for pk in changed_ids]})
+
+    def get_bulk_filterset(self, request):
+        """
+        Returns valid filterset of bulk changes, at least one filter
+        other than `status` must be passed, so whole table is never selected
+        """
+        data = request.query_params.copy()
+        data.setdefault('status', 'all')
+        filterset = self.filterset_class(
+            data, queryset=self.get_queryset(), request=request
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        if not any(
+            value not in EMPTY_VALUES
+            for name, value in filterset.form.cleaned_data.items()
+            if name != 'status'
+        ):
+            raise ValidationError(
+                {'detail': 'Pass ids or query parameters to select Criteria'}
+            )
+        return filterset
+
+    @staticmethod
+    def update_status(queryset, new_status):
+        """
+        Sets status of Criteria in queryset and bumps their date_modified
+        with one UPDATE ... RETURNING (update() of Django returns
+        only number of rows), returns ids of updated rows
+        """
+        subquery, params = (
+            queryset.order_by().values('pk').query.sql_with_params()
+        )
+        table = Criteria._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE "{table}" SET "status" = %s, "date_modified" = %s '
+                f'WHERE "id" IN ({subquery}) RETURNING "id"',
+                [new_status, timezone.now(), *params]
+            )
+            return [pk for pk, in cursor.fetchall()]
+
     def destroy(self, request, *args, **kwargs):
         """Instead of deleting Criteria we set archive = True"""
         instance = self.get_object()
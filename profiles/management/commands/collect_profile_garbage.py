@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from profiles.models import ProfileCriteria, Requirement, RequirementGroup
+
+
+# every node is orphaned when nothing links to it through m2m table,
+# parents go first, so their deletion orphans their children in the same run
+ORPHANED_NODES = (
+    (ProfileCriteria, 'profile'),
+    (RequirementGroup, 'profilecriteria'),
+    (Requirement, 'requirementgroup'),
+)
+
+
+def delete_orphans_batch(model, reverse_name, batch_size):
+    """
+    Deletes up to batch_size rows of model not linked by any parent.
+    Rows are locked with SKIP LOCKED, so rows referenced by requests
+    (which lock them, see ProfileBaseSerializer) are left for the next run
+    and requests are never blocked for long
+    """
+    orphan_filter = {f'{reverse_name}__isnull': True}
+    with transaction.atomic():
+        locked_ids = list(
+            model.objects.filter(**orphan_filter)
+            .select_for_update(skip_locked=True, of=('self', ))
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not locked_ids:
+            return 0
+        # links committed after the first query started are not seen by it,
+        # so deleted rows are checked again: locked rows can not get
+        # new links until commit
+        _, deleted = model.objects.filter(
+            pk__in=locked_ids, **orphan_filter
+        ).delete()
+    return deleted.get(model._meta.label, 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes ProfileCriteria, RequirementGroup and Requirement rows '
+        'which are not linked to any profile, in short transactions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--max-batches', type=int, default=0,
+            help=(
+                'Stop after this number of batches of every model, '
+                '0 - no limit'
+            )
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_batches = options['max_batches']
+        for model, reverse_name in ORPHANED_NODES:
+            deleted_count = 0
+            batches_count = 0
+            while not max_batches or batches_count < max_batches:
+                deleted = delete_orphans_batch(model, reverse_name, batch_size)
+                deleted_count += deleted
+                batches_count += 1
+                if deleted < batch_size:
+                    break
+            self.stdout.write(
+                f'Deleted {deleted_count} orphaned {model.__name__} rows'
+            )
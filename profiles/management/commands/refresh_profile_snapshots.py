@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from profiles.models import Profile
+from profiles.serializers import (
+    get_profile_tree_prefetch, refresh_denormalized_fields
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Renders stored snapshots of profile documents and ids of related '
+        'Criteria again, e.g. after changes of profile serializers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Render only profiles which have no snapshot yet'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Profile.objects.order_by('pk')
+        if options['missing']:
+            queryset = queryset.filter(snapshot__isnull=True)
+        profile_ids = list(queryset.values_list('pk', flat=True))
+
+        batch_size = options['batch_size']
+        for start in range(0, len(profile_ids), batch_size):
+            batch = Profile.objects.filter(
+                pk__in=profile_ids[start:start + batch_size]
+            ).prefetch_related(*get_profile_tree_prefetch())
+            with transaction.atomic():
+                for instance in batch:
+                    refresh_denormalized_fields(instance)
+        self.stdout.write(f'Refreshed {len(profile_ids)} profile snapshots')
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:42
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+import rest_framework.utils.encoders
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_auto_20200212_1018'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='snapshot',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, editable=False, encoder=rest_framework.utils.encoders.JSONEncoder, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:49
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+FILL_RELATED_CRITERIA_IDS = '''
+UPDATE profiles_profile SET related_criteria_ids = COALESCE((
+    SELECT array_agg(DISTINCT requirement.related_criteria_id)
+    FROM profiles_profile_criteria profile_criteria
+    JOIN profiles_profilecriteria_requirement_groups criteria_group
+        ON criteria_group.profilecriteria_id = profile_criteria.profilecriteria_id
+    JOIN profiles_requirementgroup_requirements group_requirement
+        ON group_requirement.requirementgroup_id = criteria_group.requirementgroup_id
+    JOIN profiles_requirement requirement
+        ON requirement.id = group_requirement.requirement_id
+    WHERE profile_criteria.profile_id = profiles_profile.id
+), '{}')
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0005_profile_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='related_criteria_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.UUIDField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['related_criteria_ids'], name='profiles_pr_related_f23abc_gin'),
+        ),
+        migrations.RunSQL(FILL_RELATED_CRITERIA_IDS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0006_profile_related_criteria_ids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['date_modified', 'id'], name='profiles_pr_date_mo_6d3b0f_idx'),
+        ),
+    ]
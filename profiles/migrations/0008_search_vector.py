@@ -0,0 +1,49 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:55
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+UPDATE_SEARCH_VECTOR = '''
+CREATE FUNCTION profiles_profile_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.classification_description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER profiles_profile_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, description, classification_description
+    ON profiles_profile FOR EACH ROW EXECUTE PROCEDURE profiles_profile_search_vector_update();
+
+UPDATE profiles_profile SET title = title;
+'''
+
+DROP_SEARCH_VECTOR_UPDATE = '''
+DROP TRIGGER profiles_profile_search_vector_update ON profiles_profile;
+DROP FUNCTION profiles_profile_search_vector_update();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0007_auto_20261018_1250'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='profiles_pr_search__4d8435_gin'),
+        ),
+        migrations.RunSQL(UPDATE_SEARCH_VECTOR, DROP_SEARCH_VECTOR_UPDATE),
+    ]
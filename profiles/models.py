@@ -1,8 +1,10 @@
 import uuid
 
 from django.contrib.postgres.fields import ArrayField, JSONField
-from django.contrib.postgres.indexes import BrinIndex
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from rest_framework.utils.encoders import JSONEncoder
 
 STATUS_CHOICES = (
     ('active', 'Active'),
@@ -52,10 +54,27 @@ class Profile(models.Model):
         default=True, null=True, blank=True
     )
 
+    # fields below are derived from the whole profile document,
+    # see profiles.serializers.refresh_denormalized_fields
+    snapshot = JSONField(
+        encoder=JSONEncoder, blank=True, null=True, editable=False
+    )
+    related_criteria_ids = ArrayField(
+        models.UUIDField(), blank=True, default=list, editable=False
+    )
+
+    # weighted title, description and classification_description,
+    # kept by database trigger (see migration 0008)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ('-date_modified', )
         indexes = (
             BrinIndex(fields=['date_modified']),
+            # keyset pagination, see criteria.pagination
+            models.Index(fields=['date_modified', 'id']),
+            GinIndex(fields=['related_criteria_ids']),
+            GinIndex(fields=['search_vector']),
         )
 
     def __str__(self):
@@ -1,5 +1,10 @@
+import uuid
+from collections import defaultdict
 from operator import itemgetter
 
+from django.db import transaction
+from django.db.models import Prefetch, Q, prefetch_related_objects
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
@@ -8,12 +13,60 @@ from profiles.models import (
     CURRENCY_CHOICES, Profile, ProfileCriteria, Requirement, RequirementGroup
 )
 from profiles.mixins import ValidateRequiredFieldsMixin
+from profiles.writers import ProfileTreeWriter
 from standarts.serializers import (
     AdditionalClassificationSerializer, ClassificationSerializer,
     UnitSerializer
 )
 
 
+ACTIVE_CRITERIA_CONTEXT_KEY = 'active_criteria'
+
+
+def get_active_criteria(context, criteria_ids):
+    """
+    Returns dict of active Criteria by passed ids, None for missing ones.
+    Fetched Criteria are cached in serializer context, so every id
+    is queried once per request however many times it is referenced
+    """
+    cache = context.setdefault(ACTIVE_CRITERIA_CONTEXT_KEY, {})
+    missing_ids = set(criteria_ids) - cache.keys()
+    if missing_ids:
+        criteria = Criteria.objects.filter(id__in=missing_ids, status='active')
+        criteria_by_id = {criterion.id: criterion for criterion in criteria}
+        for criteria_id in missing_ids:
+            cache[criteria_id] = criteria_by_id.get(criteria_id)
+    return {criteria_id: cache[criteria_id] for criteria_id in criteria_ids}
+
+
+def get_related_criteria_ids(data):
+    """Collects valid relatedCriteria_id values of not validated profile data"""
+    def get_items(data, key):
+        items = data.get(key) if isinstance(data, dict) else None
+        return items if isinstance(items, list) else []
+
+    criteria_ids = set()
+    for criteria in get_items(data, 'criteria'):
+        for requirement_group in get_items(criteria, 'requirementGroups'):
+            for requirement in get_items(requirement_group, 'requirements'):
+                try:
+                    criteria_ids.add(
+                        uuid.UUID(str(requirement['relatedCriteria_id']))
+                    )
+                except (KeyError, TypeError, ValueError):
+                    continue
+    return criteria_ids
+
+
+def get_requirement_key(requirement):
+    """Values which make requirements equal, they have no public ids"""
+    return (
+        requirement.related_criteria_id, requirement.title,
+        requirement.description, requirement.expected_value,
+        requirement.min_value, requirement.max_value,
+    )
+
+
 class RequirementSerializer(serializers.ModelSerializer):
     ONE_VALUE_AT_A_TIME_FIELDS = set(
         ('expected_value', 'min_value', 'max_value')
@@ -86,9 +139,8 @@ class RequirementSerializer(serializers.ModelSerializer):
                 raise ValidationError(error_dict)
 
     def validate_relatedCriteria_id(self, value):
-        try:
-            self.criteria = Criteria.objects.get(id=value, status='active')
-        except Criteria.DoesNotExist:
+        self.criteria = get_active_criteria(self.context, [value])[value]
+        if self.criteria is None:
             raise ValidationError(
                 {'relatedCriteria_id': 'No active Criteria found by passed id'}
             )
@@ -165,29 +217,35 @@ class ProfileBaseSerializer(serializers.ModelSerializer):
             'classification_id', 'classification_description', 'unit_code',
             'unit_name', 'value_amount', 'additional_classification',
             'value_currency', 'value_value_added_tax_included', 'access_token',
-            'date_modified'
+            'date_modified', 'snapshot', 'related_criteria_ids', 'search_vector'
         )
         read_only_fields = ('author', )
 
-    def _create_requirement(self, requirement_data):
-        criteria = Criteria.objects.get(
-            id=requirement_data.pop('related_criteria_id'),
-            status='active'
-        )
-        requirement_data['related_criteria'] = criteria
-        return Requirement.objects.create(
-            **requirement_data
-        )
+    def to_internal_value(self, data):
+        # all related Criteria of the payload are fetched with one query
+        get_active_criteria(self.context, get_related_criteria_ids(data))
+        return super().to_internal_value(data)
 
-    def _create_requirement_group(self, requirement_group_data):
-        requirements_list = requirement_group_data.pop('requirements', [])
-        group_id = requirement_group_data.pop('id', {}).get('hex')
-        if group_id:
-            try:
-                requirement_group = RequirementGroup.objects.get(
-                    id=group_id
-                )
-            except RequirementGroup.DoesNotExist:
+    def _get_active_criteria(self, criteria_ids):
+        """Returns active Criteria by passed ids, resolved during validation"""
+        criteria_by_id = get_active_criteria(self.context, criteria_ids)
+        if None in criteria_by_id.values():
+            raise ValidationError({
+                'relatedCriteria_id': 'No active Criteria found by passed id'
+            })
+        return criteria_by_id
+
+    def _get_requirement_groups(self, group_ids):
+        # referenced nodes are locked until commit, so they are neither
+        # collected as garbage nor changed by concurrent requests
+        groups = RequirementGroup.objects.filter(
+            id__in=group_ids
+        ).order_by('pk').select_for_update(of=('self', )).prefetch_related(
+            'requirements'
+        )
+        groups_by_id = {group.id.hex: group for group in groups}
+        for group_id in group_ids:
+            if group_id not in groups_by_id:
                 raise ValidationError({
                     'criteria': [
                         {'requirementGroups': [{
@@ -195,38 +253,129 @@ class ProfileBaseSerializer(serializers.ModelSerializer):
                         }]}
                     ]
                 })
+        return groups_by_id
+
+    def _get_requirement_group_ids(self, criteria_data_list):
+        """
+        Returns ids of existing requirement groups passed in payload,
+        a group may be passed several times, but only with equal data
+        """
+        groups_data = {}
+        for criteria_data in criteria_data_list:
+            for group_data in criteria_data.get('requirement_groups', []):
+                group_id = group_data.get('id', {}).get('hex')
+                if not group_id:
+                    continue
+                if groups_data.setdefault(group_id, group_data) != group_data:
+                    raise ValidationError({
+                        'criteria': [
+                            {'requirementGroups': [{
+                                'id': f'RequirementGroup with id {group_id} '
+                                      f'is passed with different data'
+                            }]}
+                        ]
+                    })
+        return set(groups_data)
+
+    def _set_changed_attrs(self, instance, data, writer):
+        changed_attrs = [
+            attr for attr, value in data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed_attrs:
+            setattr(instance, attr, data[attr])
+        if changed_attrs:
+            writer.update(instance, changed_attrs)
+
+    def _set_links(self, relation, source, current_targets, targets, writer):
+        """Writes only added and removed links of m2m relation"""
+        current_ids = set(target.pk for target in current_targets)
+        for target in targets:
+            if target.pk not in current_ids:
+                writer.link(relation, source, target)
+        writer.unlink(
+            relation, source, current_ids - set(target.pk for target in targets)
+        )
 
-            for attr, value in requirement_group_data.items():
-                setattr(requirement_group, attr, value)
-            requirement_group.save()
-        else:
-            requirement_group = RequirementGroup.objects.create(
-                **requirement_group_data
+    def _build_requirement(self, requirement_data):
+        requirement_data = dict(requirement_data)
+        criteria_id = requirement_data.pop('related_criteria_id')
+        requirement_data['related_criteria'] = self._get_active_criteria(
+            [criteria_id]
+        )[criteria_id]
+        return Requirement(**requirement_data)
+
+    def _set_requirements(
+        self, requirement_group, requirements_list, writer, current=()
+    ):
+        """
+        Makes requirements of group equal to passed ones.
+        Requirements have no ids, so stored ones are matched by values:
+        equal requirements are kept, other stored ones are unlinked
+        """
+        stored_requirements = defaultdict(list)
+        for requirement in current:
+            stored_requirements[get_requirement_key(requirement)].append(
+                requirement
             )
 
-        if requirements_list:
-            self._set_requirements_to_requirement_group(
-                requirements_list, requirement_group
+        for requirement_data in requirements_list:
+            requirement = self._build_requirement(requirement_data)
+            equal_requirements = stored_requirements[
+                get_requirement_key(requirement)
+            ]
+            if equal_requirements:
+                equal_requirements.pop()
+                continue
+            writer.create(requirement)
+            writer.link(
+                RequirementGroup.requirements, requirement_group, requirement
             )
-        return requirement_group
 
-    def _set_requirements_to_requirement_group(
-        self, requirements_list_data, requirement_group
+        writer.unlink(
+            RequirementGroup.requirements, requirement_group, [
+                requirement.pk
+                for requirements in stored_requirements.values()
+                for requirement in requirements
+            ]
+        )
+
+    def _build_requirement_group(
+        self, requirement_group_data, writer, groups_by_id
     ):
-        requirement_instances = []
-        for requirement_data in requirements_list_data:
-            requirement = self._create_requirement(requirement_data)
-            requirement_instances.append(requirement)
-        requirement_group.requirements.set(requirement_instances)
+        requirements_list = requirement_group_data.pop('requirements', [])
+        group_id = requirement_group_data.pop('id', {}).get('hex')
+        if group_id in writer.built:
+            return writer.built[group_id]
+        if group_id:
+            requirement_group = writer.built[group_id] = groups_by_id[group_id]
+            self._set_changed_attrs(
+                requirement_group, requirement_group_data, writer
+            )
+            if requirements_list:
+                self._set_requirements(
+                    requirement_group, requirements_list, writer,
+                    requirement_group.requirements.all()
+                )
+        else:
+            requirement_group = RequirementGroup(**requirement_group_data)
+            writer.create(requirement_group)
+            self._set_requirements(requirement_group, requirements_list, writer)
+        return requirement_group
 
-    def _create_criteria(self, criteria_data):
+    def _build_criteria(self, criteria_data, writer, groups_by_id):
         requirement_group_list = criteria_data.pop('requirement_groups', [])
-        profile_criteria = ProfileCriteria.objects.create(**criteria_data)
+        criteria_data.pop('id', None)
+        profile_criteria = ProfileCriteria(**criteria_data)
+        writer.create(profile_criteria)
         for requirement_group_data in requirement_group_list:
-            requirement_group = self._create_requirement_group(
-                requirement_group_data
+            requirement_group = self._build_requirement_group(
+                requirement_group_data, writer, groups_by_id
+            )
+            writer.link(
+                ProfileCriteria.requirement_groups,
+                profile_criteria, requirement_group
             )
-            profile_criteria.requirement_groups.add(requirement_group)
         return profile_criteria
 
 
@@ -238,24 +387,26 @@ class ProfileCreateSerializer(ProfileBaseSerializer):
     )
     status = serializers.CharField(read_only=True)
 
+    @transaction.atomic
     def create(self, data):
         criteria_data_list = data.pop('criteria')
         data['author'] = self.context['request'].user.username
         instance = Profile.objects.create(**data)
 
-        criteria_instances = self._create_requirement_criteria(
-            criteria_data_list
+        # whole tree is written with one bulk insert per table
+        writer = ProfileTreeWriter()
+        groups_by_id = self._get_requirement_groups(
+            self._get_requirement_group_ids(criteria_data_list)
         )
-        instance.criteria.set(criteria_instances)
-        return instance
-
-    def _create_requirement_criteria(self, criteria_data_list):
-        criteria_instances = []
         for criteria_data in criteria_data_list:
-            profile_criteria = self._create_criteria(criteria_data)
-
-            criteria_instances.append(profile_criteria)
-        return criteria_instances
+            profile_criteria = self._build_criteria(
+                criteria_data, writer, groups_by_id
+            )
+            writer.link(Profile.criteria, instance, profile_criteria)
+        writer.save()
+        refresh_denormalized_fields(instance)
+        refresh_profiles_sharing_nodes(instance, writer.get_changed_nodes())
+        return instance
 
 
 class ProfileEditSerializer(ProfileBaseSerializer):
@@ -265,17 +416,20 @@ class ProfileEditSerializer(ProfileBaseSerializer):
         allow_null=True, many=True, read_only=True
     )
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         criteria_data_list = validated_data.pop('criteria', [])
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
 
+        changed_nodes = {}
         if criteria_data_list:
-            criteria_instances = self._update_requirement_criteria(
+            changed_nodes = self._update_criteria_tree(
                 criteria_data_list, instance
             )
-            instance.criteria.set(criteria_instances)
+        refresh_denormalized_fields(instance)
+        refresh_profiles_sharing_nodes(instance, changed_nodes)
         return instance
 
     def validate(self, data):
@@ -292,67 +446,162 @@ class ProfileEditSerializer(ProfileBaseSerializer):
                 )
         return super().validate(data)
 
-    def _update_requirement_criteria(self, criteria_data_list, instance):
+    def _get_profile_criteria(self, criteria_ids):
+        criteria = ProfileCriteria.objects.filter(
+            id__in=criteria_ids
+        ).order_by('pk').select_for_update(of=('self', )).prefetch_related(
+            'requirement_groups__requirements'
+        )
+        criteria_by_id = {
+            profile_criteria.id.hex: profile_criteria
+            for profile_criteria in criteria
+        }
+        for criteria_id in criteria_ids:
+            if criteria_id not in criteria_by_id:
+                raise ValidationError({
+                    'criteria': [
+                        {'id': f'Criteria with id {criteria_id} not found'}
+                    ]
+                })
+        return criteria_by_id
+
+    def _update_criteria_tree(self, criteria_data_list, instance):
+        """
+        Compares passed criteria with stored tree of the profile and writes
+        only nodes which differ: changed fields, new nodes and changed links.
+        Returns changed existing nodes (see ProfileTreeWriter.get_changed_nodes)
+        """
+        current_criteria = list(instance.criteria.prefetch_related(
+            'requirement_groups__requirements'
+        ))
+        criteria_by_id = {
+            profile_criteria.id.hex: profile_criteria
+            for profile_criteria in current_criteria
+        }
+        criteria_by_id.update(self._get_profile_criteria(set(
+            criteria_data['id']['hex'] for criteria_data in criteria_data_list
+            if criteria_data.get('id', {}).get('hex')
+        ) - criteria_by_id.keys()))
+        groups_by_id = {
+            requirement_group.id.hex: requirement_group
+            for profile_criteria in criteria_by_id.values()
+            for requirement_group in profile_criteria.requirement_groups.all()
+        }
+        groups_by_id.update(self._get_requirement_groups(
+            self._get_requirement_group_ids(criteria_data_list) -
+            groups_by_id.keys()
+        ))
+
+        writer = ProfileTreeWriter()
         criteria_instances = []
         for criteria_data in criteria_data_list:
             criteria_id = criteria_data.pop('id', {}).get('hex')
-
             if criteria_id:
                 # editing existing ProfileCriteria
-                try:
-                    profile_criteria = ProfileCriteria.objects.get(
-                        id=criteria_id
-                    )
-                except ProfileCriteria.DoesNotExist:
-                    raise ValidationError({
-                        'criteria': [
-                            {'id': f'Criteria with id {criteria_id} not found'}
-                        ]
-                    })
-                # setting new field values for ProfileCriteria
-                requirement_group_list = criteria_data.pop('requirement_groups', None)
-                for attr, value in criteria_data.items():
-                    setattr(profile_criteria, attr, value)
-                profile_criteria.save()
-
-                requirement_group_instances = []
-                for requirement_group_data in requirement_group_list or []:
-                    requirement_group_id = requirement_group_data.pop('id', {}).get('hex')
-
-                    if requirement_group_id:
-                        # editing existing RequirementGroup
-                        try:
-                            requirement_group = RequirementGroup.objects.get(
-                                id=requirement_group_id
-                            )
-                        except RequirementGroup.DoesNotExist:
-                            raise ValidationError({
-                                'criteria': [
-                                    {'requirementGroups': [{
-                                        'id': f'RequirementGroup with id {requirement_group_id} not found'
-                                    }]}
-                                ]
-                            })
-
-                        requirements_list = requirement_group_data.pop('requirements', [])
-                        # setting new field values for RequirementGroup
-                        for attr, value in requirement_group_data.items():
-                            setattr(requirement_group, attr, value)
-                        requirement_group.save()
-
-                        if requirements_list:
-                            self._set_requirements_to_requirement_group(
-                                requirements_list, requirement_group
-                            )
-                    else:
-                        # creating RequirementGroup
-                        requirement_group = self._create_requirement_group(requirement_group_data)
-                    requirement_group_instances.append(requirement_group)
-
+                profile_criteria = criteria_by_id[criteria_id]
+                requirement_group_list = criteria_data.pop(
+                    'requirement_groups', None
+                )
+                self._set_changed_attrs(profile_criteria, criteria_data, writer)
                 if requirement_group_list is not None:
-                    profile_criteria.requirement_groups.set(requirement_group_instances)
+                    self._set_links(
+                        ProfileCriteria.requirement_groups, profile_criteria,
+                        profile_criteria.requirement_groups.all(), [
+                            self._build_requirement_group(
+                                requirement_group_data, writer, groups_by_id
+                            )
+                            for requirement_group_data in requirement_group_list
+                        ],
+                        writer
+                    )
             else:
-                # creating ProfileCriteria
-                profile_criteria = self._create_criteria(criteria_data)
+                profile_criteria = self._build_criteria(
+                    criteria_data, writer, groups_by_id
+                )
             criteria_instances.append(profile_criteria)
-        return criteria_instances
+
+        self._set_links(
+            Profile.criteria, instance, current_criteria, criteria_instances,
+            writer
+        )
+        writer.save()
+        return writer.get_changed_nodes()
+
+
+def get_profile_tree_prefetch():
+    """
+    Prefetch plan for the whole nested tree of Profile serializers:
+    one query per level, related Criteria are joined to requirements
+    """
+    return (
+        'criteria',
+        'criteria__requirement_groups',
+        Prefetch(
+            'criteria__requirement_groups__requirements',
+            queryset=Requirement.objects.select_related('related_criteria')
+        ),
+    )
+
+
+def get_profile_related_criteria_ids(instance):
+    return sorted(set(
+        requirement.related_criteria_id
+        for profile_criteria in instance.criteria.all()
+        for requirement_group in profile_criteria.requirement_groups.all()
+        for requirement in requirement_group.requirements.all()
+    ))
+
+
+def refresh_denormalized_fields(*instances):
+    """
+    Stores rendered profile document in Profile.snapshot and ids
+    of related Criteria in Profile.related_criteria_ids.
+    Fields are written with update(), so date_modified is left as is
+    and stays equal to dateModified of the snapshot
+    """
+    prefetch_related_objects(instances, *get_profile_tree_prefetch())
+    for instance in instances:
+        instance.snapshot = ProfileCreateSerializer(instance).data
+        instance.related_criteria_ids = get_profile_related_criteria_ids(
+            instance
+        )
+        Profile.objects.filter(pk=instance.pk).update(
+            snapshot=instance.snapshot,
+            related_criteria_ids=instance.related_criteria_ids
+        )
+
+
+def refresh_profiles_sharing_nodes(instance, changed_nodes):
+    """
+    Tree nodes referenced by id may be shared by several profiles,
+    so documents of other profiles including changed nodes are changed too:
+    their date_modified is bumped and denormalized fields are refreshed
+    """
+    query = Q()
+    if changed_nodes.get(ProfileCriteria):
+        query |= Q(criteria__in=changed_nodes[ProfileCriteria])
+    if changed_nodes.get(RequirementGroup):
+        query |= Q(
+            criteria__requirement_groups__in=changed_nodes[RequirementGroup]
+        )
+    if not query:
+        return []
+    profile_ids = set(
+        Profile.objects.filter(query).exclude(pk=instance.pk)
+        .values_list('pk', flat=True)
+    )
+    if not profile_ids:
+        return []
+
+    profiles = list(
+        Profile.objects.filter(pk__in=profile_ids)
+        .order_by('pk').select_for_update()
+    )
+    date_modified = timezone.now()
+    Profile.objects.filter(pk__in=profile_ids).update(
+        date_modified=date_modified
+    )
+    for profile in profiles:
+        profile.date_modified = date_modified
+    refresh_denormalized_fields(*profiles)
+    return profiles
@@ -1,14 +1,33 @@
+import io
+import json
 import os
+import time
 from copy import deepcopy
+from threading import Event, Thread, current_thread
+from unittest import mock
 import uuid
 
 from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
 from passlib.apache import HtpasswdFile
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import (
+    APIClient, APITestCase, APITransactionTestCase
+)
+from rest_framework.utils.encoders import JSONEncoder
 
 from criteria.models import Criteria
-from profiles.models import Profile
+from profiles.models import (
+    Profile, ProfileCriteria, Requirement, RequirementGroup
+)
+from profiles.management.commands.collect_profile_garbage import (
+    delete_orphans_batch
+)
+from profiles.serializers import ProfileCreateSerializer
+from profiles.writers import ProfileTreeWriter
 
 API_URL = '/api/0/profiles/'
 
@@ -18,7 +37,7 @@ USER_CREDENTIALS = {
 }
 
 
-class ProfileAPITestCase(APITestCase):
+class ProfileAPITestMixin:
     def setUp(self):
         ht = HtpasswdFile(settings.PATH_TO_HTPASSWD_FILE, new=True)
         for username, password in USER_CREDENTIALS.items():
@@ -163,6 +182,10 @@ class ProfileAPITestCase(APITestCase):
         os.remove(settings.PATH_TO_HTPASSWD_FILE)
 
 
+class ProfileAPITestCase(ProfileAPITestMixin, APITestCase):
+    pass
+
+
 class TestProfileCreating(ProfileAPITestCase):
     def test_profile_creating_errors(self):
         self.assertEqual(Profile.objects.count(), 0)
@@ -229,6 +252,13 @@ class TestProfileCreating(ProfileAPITestCase):
             status.HTTP_400_BAD_REQUEST
         )
 
+        criteria.status = 'retired'
+        criteria.save()
+        requirement['relatedCriteria_id'] = criteria.id.hex
+        post_response = self.client.post(path=API_URL, data=profile_data)
+        self.assertEqual(post_response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('relatedCriteria_id', str(post_response.json()))
+
     def test_profile_creating(self):
         profile_data = self.valid_profile_data_2
         post_response = self.client.post(path=API_URL, data=profile_data)
@@ -264,6 +294,113 @@ class TestProfileCreating(ProfileAPITestCase):
             len(profile_data['additionalClassification'])
         )
 
+    def test_profile_creating_with_shared_nodes(self):
+        post_response = self.client.post(
+            path=API_URL, data=self.valid_profile_data_1
+        )
+        profile_a = post_response.json()['data']
+        date_modified = profile_a['dateModified']
+
+        # B reuses requirement group of A with other requirement
+        profile_data = deepcopy(self.valid_profile_data_2)
+        requirement_group = profile_data['criteria'][0]['requirementGroups'][0]
+        requirement_group['id'] = (
+            profile_a['criteria'][0]['requirementGroups'][0]['id']
+        )
+        post_response = self.client.post(path=API_URL, data=profile_data)
+        self.assertEqual(post_response.status_code, status.HTTP_201_CREATED)
+        profile_b = post_response.json()
+
+        get_response = self.client.get(path=f'{API_URL}{profile_a["id"]}/')
+        self.assertEqual(
+            get_response.json()['criteria'][0]['requirementGroups'],
+            profile_b['data']['criteria'][0]['requirementGroups']
+        )
+        self.assertEqual(
+            get_response.json()['criteria'][0]['requirementGroups'][0][
+                'requirements'
+            ][0]['title'],
+            'Test requirement2'
+        )
+        self.assertGreater(get_response.json()['dateModified'], date_modified)
+
+        # B changes criteria of A
+        profile_data['criteria'][0] = dict(
+            profile_a['criteria'][0], title='New criteria title'
+        )
+        patch_response = self.client.patch(
+            path=f'{API_URL}{profile_b["data"]["id"]}/',
+            data={
+                'access': profile_b['access'],
+                'data': {'criteria': profile_data['criteria']}
+            }
+        )
+        self.assertEqual(patch_response.status_code, status.HTTP_200_OK)
+        get_response = self.client.get(path=f'{API_URL}{profile_a["id"]}/')
+        self.assertEqual(
+            get_response.json()['criteria'][0]['title'], 'New criteria title'
+        )
+        # snapshots are equal to documents rendered from the tree
+        for profile in Profile.objects.all():
+            self.assertEqual(
+                self.client.get(path=f'{API_URL}{profile.id.hex}/').json(),
+                json.loads(json.dumps(
+                    ProfileCreateSerializer(profile).data, cls=JSONEncoder
+                ))
+            )
+
+    def test_profile_creating_with_repeated_nodes(self):
+        post_response = self.client.post(
+            path=API_URL, data=self.valid_profile_data_1
+        )
+        profile_a = post_response.json()['data']
+
+        # requirement group of A is passed in both criteria of B
+        profile_data = deepcopy(self.valid_profile_data_2)
+        requirement_group = profile_data['criteria'][0]['requirementGroups'][0]
+        requirement_group['id'] = (
+            profile_a['criteria'][0]['requirementGroups'][0]['id']
+        )
+        profile_data['criteria'].append(deepcopy(profile_data['criteria'][0]))
+        post_response = self.client.post(path=API_URL, data=profile_data)
+        self.assertEqual(post_response.status_code, status.HTTP_201_CREATED)
+        profile_b = post_response.json()
+        requirement_group = RequirementGroup.objects.get(
+            id=requirement_group['id']
+        )
+        self.assertEqual(requirement_group.requirements.count(), 1)
+        self.assertEqual(requirement_group.profilecriteria_set.count(), 3)
+
+        for criteria in profile_data['criteria']:
+            criteria['requirementGroups'][0]['requirements'][0][
+                'title'
+            ] = 'New requirement title'
+        patch_response = self.client.patch(
+            path=f'{API_URL}{profile_b["data"]["id"]}/',
+            data={
+                'access': profile_b['access'],
+                'data': {'criteria': profile_data['criteria']}
+            }
+        )
+        self.assertEqual(patch_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(requirement_group.requirements.values_list(
+                'title', flat=True
+            )),
+            ['New requirement title']
+        )
+
+        profile_data['criteria'][1]['requirementGroups'][0][
+            'description'
+        ] = 'Other description'
+        post_response = self.client.post(path=API_URL, data=profile_data)
+        self.assertEqual(
+            post_response.status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertIn(
+            'is passed with different data', post_response.content.decode()
+        )
+
     def test_profile_access_token(self):
         post_response = self.client.post(
             path=API_URL, data=self.valid_profile_data_1
@@ -276,6 +413,41 @@ class TestProfileCreating(ProfileAPITestCase):
         self.assertEqual(access_token, profile_obj.access_token.hex)
         self.assertEqual(access_data.get('owner'), profile_obj.author)
 
+    def test_profile_creating_queries_count(self):
+        def get_profile_data(count):
+            profile_data = deepcopy(self.valid_profile_data_1)
+            criteria = profile_data['criteria'][0]
+            requirement_group = criteria['requirementGroups'][0]
+            requirement_group['requirements'] *= count
+            criteria['requirementGroups'] = [
+                deepcopy(requirement_group) for _ in range(count)
+            ]
+            profile_data['criteria'] = [deepcopy(criteria) for _ in range(count)]
+            return profile_data
+
+        queries_count = []
+        statements_count = []
+        for count in (1, 5):
+            with CaptureQueriesContext(connection) as queries:
+                post_response = self.client.post(
+                    path=API_URL, data=get_profile_data(count)
+                )
+            self.assertEqual(post_response.status_code, status.HTTP_201_CREATED)
+            queries_count.append(len(queries))
+            statements_count.append(len([
+                query for query in queries.captured_queries
+                if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            ]))
+        self.assertEqual(queries_count[0], queries_count[1])
+        # profile, 3 models of the tree, 3 through tables and snapshot
+        self.assertEqual(statements_count, [8, 8])
+
+        profile = Profile.objects.get(id=post_response.json()['data']['id'])
+        self.assertEqual(profile.criteria.count(), 5)
+        requirement_groups = profile.criteria.all()[0].requirement_groups.all()
+        self.assertEqual(len(requirement_groups), 5)
+        self.assertEqual(requirement_groups[0].requirements.count(), 5)
+
 
 class TestProfileListing(ProfileAPITestCase):
     def test_profile_listing(self):
@@ -299,6 +471,16 @@ class TestProfileListing(ProfileAPITestCase):
             len(self.valid_profile_data)
         )
 
+        get_response = self.client.get(path=API_URL, data={'cursor': '', 'limit': 1})
+        self.assertEqual(len(get_response.json()['results']), 1)
+        next_response = self.client.get(path=get_response.json()['next'])
+        self.assertEqual(len(next_response.json()['results']), 1)
+        self.assertIsNone(next_response.json()['next'])
+        self.assertEqual(
+            [get_response.json()['results'][0]['id'], next_response.json()['results'][0]['id']],
+            [profile.id.hex for profile in Profile.objects.order_by('-date_modified', '-id')]
+        )
+
     def test_profile_filtering(self):
         criteria = Criteria.objects.create(**self.criteria_data)
         self.assertEqual(Criteria.objects.count(), 2)
@@ -321,6 +503,225 @@ class TestProfileListing(ProfileAPITestCase):
         self.assertEqual(get_response.json()['count'], 1)
         self.assertEqual(get_response.json()['results'][0]['id'], profile_id)
 
+        # profile referencing both criteria
+        requirements = profile_data['criteria'][0]['requirementGroups'][0]['requirements']
+        requirements.append(dict(
+            requirements[0], relatedCriteria_id=self.valid_profile_data_1['criteria'][0]['requirementGroups'][0]['requirements'][0]['relatedCriteria_id']  # noqa
+        ))
+        post_response = self.client.post(path=API_URL, data=profile_data)
+        self.assertEqual(post_response.status_code, status.HTTP_201_CREATED)
+        profile_id = post_response.json()['data']['id']
+
+        criteria_ids = ','.join(criteria.id.hex for criteria in Criteria.objects.all())
+        get_response = self.client.get(
+            path=API_URL,
+            data={'criteria_requirementGroups_requirements_relatedCriteria_id': criteria_ids}
+        )
+        self.assertEqual(get_response.json()['count'], 3)
+
+        get_response = self.client.get(
+            path=API_URL,
+            data={
+                'criteria_requirementGroups_requirements_relatedCriteria_id': criteria_ids,
+                'criteria_requirementGroups_requirements_relatedCriteria_match': 'all',
+            }
+        )
+        self.assertEqual(get_response.json()['count'], 1)
+        self.assertEqual(get_response.json()['results'][0]['id'], profile_id)
+
+        get_response = self.client.get(
+            path=API_URL,
+            data={
+                'criteria_requirementGroups_requirements_relatedCriteria_id': criteria_ids,
+                'criteria_requirementGroups_requirements_relatedCriteria_match': 'foo',
+            }
+        )
+        self.assertEqual(get_response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_profile_filtering_by_shared_nodes(self):
+        post_response = self.client.post(
+            path=API_URL, data=self.valid_profile_data_1
+        )
+        profile_a = post_response.json()['data']
+
+        # B reuses requirement group of A with requirement of new Criteria
+        criteria = Criteria.objects.create(**self.criteria_data)
+        profile_data = deepcopy(self.valid_profile_data_2)
+        requirement_group = profile_data['criteria'][0]['requirementGroups'][0]
+        requirement_group['id'] = (
+            profile_a['criteria'][0]['requirementGroups'][0]['id']
+        )
+        requirement_group['requirements'][0]['relatedCriteria_id'] = (
+            criteria.id.hex
+        )
+        post_response = self.client.post(path=API_URL, data=profile_data)
+        self.assertEqual(post_response.status_code, status.HTTP_201_CREATED)
+
+        for related_criteria in Criteria.objects.all():
+            get_response = self.client.get(path=API_URL, data={
+                'criteria_requirementGroups_requirements_relatedCriteria_id':
+                    related_criteria.id.hex
+            })
+            joined_profiles = Profile.objects.filter(
+                criteria__requirement_groups__requirements__related_criteria=(
+                    related_criteria
+                )
+            ).distinct()
+            self.assertEqual(
+                set(
+                    profile['id']
+                    for profile in get_response.json()['results']
+                ),
+                set(profile.id.hex for profile in joined_profiles)
+            )
+        self.assertEqual(
+            Profile.objects.filter(
+                related_criteria_ids__contains=[criteria.id]
+            ).count(),
+            2
+        )
+
+    def test_profile_filtering_by_classification(self):
+        for data in self.valid_profile_data:
+            self.client.post(path=API_URL, data=data)
+
+        # 92350000-9 is classified under 92300000-4 and 92000000-1
+        for classification_id in ('92000000-1', '92300000-4', '92350000-9', '923'):
+            get_response = self.client.get(
+                path=API_URL, data={'classification_id': classification_id}
+            )
+            self.assertEqual(get_response.json()['count'], 1)
+            self.assertEqual(
+                get_response.json()['results'][0]['classification']['id'],
+                '92350000-9'
+            )
+
+        get_response = self.client.get(
+            path=API_URL, data={'classification_id': '92351000-6'}
+        )
+        self.assertEqual(get_response.json()['count'], 0)
+
+    def test_profile_full_text_search(self):
+        for data in self.valid_profile_data:
+            self.client.post(path=API_URL, data=data)
+
+        for query, titles in (
+            ('name2', ['Test name2']),
+            ('test descr', ['Test name', 'Test name2']),
+            ('Солома', ['Test name2']),
+            ('foo', []),
+        ):
+            get_response = self.client.get(path=API_URL, data={'q': query})
+            self.assertEqual(get_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                sorted(
+                    profile['title']
+                    for profile in get_response.json()['results']
+                ),
+                titles
+            )
+
+    def test_profile_full_text_search_ordering(self):
+        # match in title weighs more than match in description,
+        # profiles are created in order opposite to their relevance
+        for title, description in (
+            ('Kitchen scales', 'Steel'), ('Scales', 'For kitchen')
+        ):
+            self.client.post(path=API_URL, data=dict(
+                deepcopy(self.valid_profile_data_1),
+                title=title, description=description
+            ))
+
+        def search(**params):
+            get_response = self.client.get(
+                path=API_URL, data=dict(params, q='kitchen')
+            )
+            return [
+                profile['title'] for profile in get_response.json()['results']
+            ]
+
+        self.assertEqual(search(), ['Scales', 'Kitchen scales'])
+        self.assertEqual(
+            search(ordering='-relevance'), ['Kitchen scales', 'Scales']
+        )
+        self.assertEqual(
+            search(ordering='relevance'), ['Scales', 'Kitchen scales']
+        )
+
+    def test_profile_listing_queries_count(self):
+        def add_criteria(profile_data, count):
+            criteria = profile_data['criteria'][0]
+            profile_data['criteria'] = [deepcopy(criteria) for _ in range(count)]
+            for criteria in profile_data['criteria']:
+                requirement_group = criteria['requirementGroups'][0]
+                criteria['requirementGroups'] = [
+                    deepcopy(requirement_group) for _ in range(count)
+                ]
+
+        profile_data = deepcopy(self.valid_profile_data_1)
+        self.client.post(path=API_URL, data=profile_data)
+        # profiles without snapshots are rendered with prefetched tree:
+        # count, profiles, criteria, requirement groups and requirements
+        Profile.objects.update(snapshot=None)
+        with self.assertNumQueries(5):
+            get_response = self.client.get(path=API_URL)
+        self.assertEqual(get_response.status_code, status.HTTP_200_OK)
+
+        add_criteria(profile_data, 3)
+        for _ in range(3):
+            self.client.post(path=API_URL, data=profile_data)
+        Profile.objects.update(snapshot=None)
+        with self.assertNumQueries(5):
+            get_response = self.client.get(path=API_URL)
+        self.assertEqual(get_response.json()['count'], 4)
+        self.assertEqual(len(get_response.json()['results'][0]['criteria']), 3)
+
+        profile_id = get_response.json()['results'][0]['id']
+        with self.assertNumQueries(4):
+            get_response = self.client.get(path=f'{API_URL}{profile_id}/')
+        self.assertEqual(get_response.status_code, status.HTTP_200_OK)
+
+    def test_profile_snapshots(self):
+        for data in self.valid_profile_data:
+            self.client.post(path=API_URL, data=data)
+        Profile.objects.filter(title='Test name2').update(snapshot=None)
+
+        # one profile is rendered, the other one is taken from snapshot
+        with self.assertNumQueries(5):
+            rendered_response = self.client.get(path=API_URL)
+        call_command('refresh_profile_snapshots', '--missing', stdout=io.StringIO())
+        self.assertFalse(Profile.objects.filter(snapshot__isnull=True).exists())
+
+        with self.assertNumQueries(2):
+            get_response = self.client.get(path=API_URL)
+        self.assertEqual(get_response.json(), rendered_response.json())
+
+        profile = Profile.objects.get(title='Test name')
+        get_response = self.client.get(path=f'{API_URL}{profile.id.hex}/')
+        self.assertEqual(
+            get_response.json()['dateModified'],
+            rendered_response.json()['results'][-1]['dateModified']
+        )
+
+        patch_response = self.client.patch(
+            path=f'{API_URL}{profile.id.hex}/',
+            data={
+                'access': {
+                    'token': profile.access_token.hex,
+                    'owner': profile.author,
+                },
+                'data': {'title': 'New title'},
+            }
+        )
+        self.assertEqual(patch_response.status_code, status.HTTP_200_OK)
+        get_response = self.client.get(path=f'{API_URL}{profile.id.hex}/')
+        self.assertEqual(get_response.json(), patch_response.json())
+        self.assertEqual(get_response.json()['title'], 'New title')
+        self.assertNotEqual(
+            get_response.json()['dateModified'],
+            rendered_response.json()['results'][-1]['dateModified']
+        )
+
 
 class TestProfileDetail(ProfileAPITestCase):
     def test_profile_detail_info(self):
@@ -634,6 +1035,121 @@ class TestProfileDetail(ProfileAPITestCase):
             status.HTTP_400_BAD_REQUEST
         )
 
+    def test_profile_patch_writes_only_changes(self):
+        post_response = self.client.post(
+            path=API_URL, data=self.valid_profile_data_1
+        )
+        profile_id = post_response.json()['data']['id']
+        criteria_data = post_response.json()['data']['criteria']
+        data = {
+            'access': post_response.json()['access'],
+            'data': {'title': 'New name', 'criteria': deepcopy(criteria_data)},
+        }
+
+        def patch(data):
+            with CaptureQueriesContext(connection) as queries:
+                patch_response = self.client.patch(
+                    path=f'{API_URL}{profile_id}/', data=data
+                )
+            self.assertEqual(patch_response.status_code, status.HTTP_200_OK)
+            statements = [
+                query['sql'].split()[:3] for query in queries.captured_queries
+                if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            ]
+            return patch_response, statements
+
+        # passing stored tree back changes profile row and its snapshot only
+        requirement_ids = set(Requirement.objects.values_list('id', flat=True))
+        patch_response, statements = patch(data)
+        self.assertEqual(statements, [
+            ['UPDATE', '"profiles_profile"', 'SET'],
+            ['UPDATE', '"profiles_profile"', 'SET'],
+        ])
+        self.assertEqual(patch_response.json()['criteria'], criteria_data)
+        self.assertEqual(
+            set(Requirement.objects.values_list('id', flat=True)),
+            requirement_ids
+        )
+
+        # changed requirement is replaced, changed title is updated
+        requirement_group = data['data']['criteria'][0]['requirementGroups'][0]
+        requirement_group['requirements'][0]['expectedValue'] = '10'
+        data['data']['criteria'][0]['title'] = 'New criteria title'
+        patch_response, statements = patch(data)
+        self.assertEqual(
+            [statement[:2] for statement in statements], [
+                ['UPDATE', '"profiles_profile"'],
+                ['INSERT', 'INTO'],
+                ['UPDATE', '"profiles_profilecriteria"'],
+                ['DELETE', 'FROM'],
+                ['INSERT', 'INTO'],
+                ['UPDATE', '"profiles_profile"'],
+            ]
+        )
+        criteria = patch_response.json()['criteria'][0]
+        self.assertEqual(criteria['title'], 'New criteria title')
+        requirements = criteria['requirementGroups'][0]['requirements']
+        self.assertEqual(len(requirements), 1)
+        self.assertEqual(requirements[0]['expectedValue'], '10')
+
+    def test_profile_garbage_collection(self):
+        for data in self.valid_profile_data:
+            self.client.post(path=API_URL, data=data)
+        profile = Profile.objects.get(title='Test name')
+
+        # criteria without ids replace the whole tree of the profile
+        patch_response = self.client.patch(
+            path=f'{API_URL}{profile.id.hex}/',
+            data={
+                'access': {
+                    'token': profile.access_token.hex,
+                    'owner': profile.author,
+                },
+                'data': {'criteria': self.valid_profile_data_2['criteria']},
+            }
+        )
+        self.assertEqual(patch_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ProfileCriteria.objects.count(), 3)
+
+        output = io.StringIO()
+        call_command('collect_profile_garbage', '--batch-size', '1', stdout=output)
+        self.assertEqual(output.getvalue().splitlines(), [
+            'Deleted 1 orphaned ProfileCriteria rows',
+            'Deleted 1 orphaned RequirementGroup rows',
+            'Deleted 1 orphaned Requirement rows',
+        ])
+        self.assertEqual(ProfileCriteria.objects.count(), 2)
+        self.assertEqual(RequirementGroup.objects.count(), 2)
+        self.assertEqual(Requirement.objects.count(), 2)
+
+        get_response = self.client.get(path=f'{API_URL}{profile.id.hex}/')
+        self.assertEqual(get_response.json(), patch_response.json())
+
+    def test_profile_garbage_collection_rechecks_links(self):
+        self.client.post(path=API_URL, data=self.valid_profile_data_1)
+        profile_criteria = ProfileCriteria.objects.get()
+        orphan_group = RequirementGroup.objects.create(description='Orphan')
+        through = ProfileCriteria.requirement_groups.through
+        delete = QuerySet.delete
+
+        def link_and_delete(queryset):
+            # node gets linked after it was selected as orphan
+            through.objects.create(
+                profilecriteria=profile_criteria, requirementgroup=orphan_group
+            )
+            return delete(queryset)
+
+        with mock.patch.object(
+            QuerySet, 'delete', autospec=True, side_effect=link_and_delete
+        ):
+            deleted = delete_orphans_batch(
+                RequirementGroup, 'profilecriteria', 10
+            )
+        self.assertEqual(deleted, 0)
+        self.assertIn(
+            orphan_group, profile_criteria.requirement_groups.all()
+        )
+
     def test_profile_delete(self):
         self.client.post(path=API_URL, data=self.valid_profile_data_1)
         profile_obj = Profile.objects.first()
@@ -659,3 +1175,109 @@ class TestProfileDetail(ProfileAPITestCase):
 
         profile_obj = Profile.objects.get()
         self.assertEqual(profile_obj.status, 'hidden')
+
+
+class TestConcurrentGarbageCollection(
+    ProfileAPITestMixin, APITransactionTestCase
+):
+    """Requests and garbage collection run in separate transactions"""
+    def setUp(self):
+        super().setUp()
+        post_response = self.client.post(
+            path=API_URL, data=self.valid_profile_data_1
+        )
+        self.profile = post_response.json()
+        self.orphan_group = RequirementGroup.objects.create(
+            description='Orphan'
+        )
+        self.criteria_list = deepcopy(self.valid_profile_data_2['criteria'])
+        self.criteria_list[0]['requirementGroups'][0]['id'] = (
+            self.orphan_group.id.hex
+        )
+        self.status_codes = []
+
+    def patch_profile(self):
+        """Links orphaned requirement group to the profile"""
+        client = APIClient()
+        client.credentials(**self.client._credentials)
+        try:
+            patch_response = client.patch(
+                path=f'{API_URL}{self.profile["data"]["id"]}/',
+                data={
+                    'access': self.profile['access'],
+                    'data': {'criteria': self.criteria_list},
+                }
+            )
+            self.status_codes.append(patch_response.status_code)
+        finally:
+            connection.close()
+
+    def wait_for_lock(self):
+        """Waits until other connection is blocked by lock of this one"""
+        for _ in range(100):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT count(*) FROM pg_locks '
+                    'WHERE NOT granted AND pid <> pg_backend_pid()'
+                )
+                if cursor.fetchone()[0]:
+                    return
+            time.sleep(0.05)
+        self.fail('Request was not blocked by garbage collection')
+
+    def test_request_waits_for_collected_rows(self):
+        writer = Thread(target=self.patch_profile)
+        delete = QuerySet.delete
+
+        def start_writer_and_delete(queryset):
+            if current_thread() is not writer and not writer.is_alive():
+                writer.start()
+                self.wait_for_lock()
+            return delete(queryset)
+
+        with mock.patch.object(
+            QuerySet, 'delete', autospec=True,
+            side_effect=start_writer_and_delete
+        ):
+            deleted = delete_orphans_batch(
+                RequirementGroup, 'profilecriteria', 10
+            )
+            writer.join()
+
+        # request gets validation error instead of broken link
+        self.assertEqual(deleted, 1)
+        self.assertEqual(self.status_codes, [status.HTTP_400_BAD_REQUEST])
+        self.assertFalse(
+            RequirementGroup.objects.filter(pk=self.orphan_group.pk).exists()
+        )
+
+    def test_collection_skips_rows_locked_by_request(self):
+        writer = Thread(target=self.patch_profile)
+        linked = Event()
+        collected = Event()
+        save = ProfileTreeWriter.save
+
+        def save_and_wait(tree_writer):
+            save(tree_writer)
+            linked.set()
+            collected.wait(10)
+
+        with mock.patch.object(
+            ProfileTreeWriter, 'save', autospec=True, side_effect=save_and_wait
+        ):
+            writer.start()
+            self.assertTrue(linked.wait(10))
+            deleted = delete_orphans_batch(
+                RequirementGroup, 'profilecriteria', 10
+            )
+            collected.set()
+            writer.join()
+
+        self.assertEqual(deleted, 0)
+        self.assertEqual(self.status_codes, [status.HTTP_200_OK])
+        self.assertEqual(
+            ProfileCriteria.objects.get(
+                requirement_groups=self.orphan_group
+            ).profile_set.get().id.hex,
+            self.profile['data']['id']
+        )
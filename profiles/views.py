@@ -1,3 +1,5 @@
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django_filters import rest_framework as filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
@@ -5,18 +7,34 @@ from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from criteria.filters import FullTextSearchFilter
 from criteria.permissions import IsAdminOrReadOnlyPermission
 from profiles import models as profile_models
 from profiles import serializers as profile_serializers
+from standarts.filters import ClassificationTreeFilter
+
+
+RELATED_CRITERIA_MATCH_CHOICES = (
+    ('any', 'Any'),
+    ('all', 'All'),
+)
+
+
+class UUIDInFilter(filters.BaseInFilter, filters.UUIDFilter):
+    """Filter by comma separated list of UUIDs"""
 
 
 class ProfileFilter(filters.FilterSet):
-    classification_id = filters.CharFilter(lookup_expr='icontains')
+    q = FullTextSearchFilter()
+    classification_id = ClassificationTreeFilter()
     classification_description = filters.CharFilter(lookup_expr='icontains')
     autor = filters.CharFilter(lookup_expr='icontains')
-    criteria_requirementGroups_requirements_relatedCriteria_id = filters.UUIDFilter(  # noqa
-        field_name='criteria_requirementGroups_requirements_relatedCriteria_id',  # noqa
-        method='filter_related_criteria'
+    criteria_requirementGroups_requirements_relatedCriteria_id = UUIDInFilter(  # noqa
+        field_name='related_criteria_ids', method='filter_related_criteria'
+    )
+    # whether profiles should reference any or all of passed Criteria
+    criteria_requirementGroups_requirements_relatedCriteria_match = filters.ChoiceFilter(  # noqa
+        choices=RELATED_CRITERIA_MATCH_CHOICES, method='filter_related_criteria_match'  # noqa
     )
 
     class Meta:
@@ -24,13 +42,21 @@ class ProfileFilter(filters.FilterSet):
         fields = (
             'classification_id', 'classification_description', 'autor',
             'criteria_requirementGroups_requirements_relatedCriteria_id',
+            'criteria_requirementGroups_requirements_relatedCriteria_match',
             'status'
         )
 
     def filter_related_criteria(self, queryset, name, value):
-        return queryset.filter(
-            criteria__requirement_groups__requirements__related_criteria__id=value  # noqa
-        ).distinct()
+        match = self.form.cleaned_data.get(
+            'criteria_requirementGroups_requirements_relatedCriteria_match'
+        )
+        if match == 'all':
+            return queryset.filter(related_criteria_ids__contains=value)
+        return queryset.filter(related_criteria_ids__overlap=value)
+
+    def filter_related_criteria_match(self, queryset, name, value):
+        # applied by filter_related_criteria
+        return queryset
 
 
 class ProfileViewSet(viewsets.ModelViewSet):
@@ -47,6 +73,33 @@ class ProfileViewSet(viewsets.ModelViewSet):
         else:
             return profile_serializers.ProfileEditSerializer
 
+    def get_representations(self, instances):
+        """
+        Returns stored snapshots of profiles,
+        profiles without snapshot are rendered by serializer
+        """
+        missing = [instance for instance in instances if instance.snapshot is None]
+        if missing:
+            prefetch_related_objects(
+                missing, *profile_serializers.get_profile_tree_prefetch()
+            )
+        return [
+            instance.snapshot if instance.snapshot is not None
+            else self.get_serializer(instance).data
+            for instance in instances
+        ]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_representations(page))
+        return Response(self.get_representations(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return Response(self.get_representations([instance])[0])
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -107,8 +160,7 @@ class ProfileViewSet(viewsets.ModelViewSet):
             else:
                 instance = self.get_object()
                 instance.status = 'hidden'
-                instance.save()
-                serializer = profile_serializers.ProfileCreateSerializer(
-                    instance
-                )
-                return Response(serializer.data, status=status.HTTP_200_OK)
+                with transaction.atomic():
+                    instance.save()
+                    profile_serializers.refresh_denormalized_fields(instance)
+                return Response(instance.snapshot, status=status.HTTP_200_OK)
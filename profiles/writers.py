@@ -0,0 +1,100 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+
+def get_through_fields(relation):
+    """Returns attnames of source and target columns of m2m through table"""
+    field = relation.field
+    return (
+        f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+    )
+
+
+class ProfileTreeWriter:
+    """
+    Collects changes of profile criteria tree and writes them at once:
+    one bulk statement per model and per m2m through table,
+    so number of statements does not depend on size of the tree.
+
+    Models passed to create() are inserted in order of their first
+    appearance, links are added after all rows were inserted,
+    so they may reference not saved instances.
+
+    `built` maps ids of existing nodes passed in payload to their instances,
+    so a node passed several times is changed only once.
+    """
+    def __init__(self):
+        self.built = {}
+        self._created = defaultdict(list)
+        self._updated = defaultdict(dict)
+        self._linked = defaultdict(list)
+        self._unlinked = defaultdict(list)
+
+    def create(self, instance):
+        self._created[type(instance)].append(instance)
+
+    def update(self, instance, fields):
+        _, updated_fields = self._updated[type(instance)].setdefault(
+            instance.pk, (instance, set())
+        )
+        updated_fields.update(fields)
+
+    def link(self, relation, source, target):
+        """Adds target to m2m relation (e.g. Profile.criteria) of source"""
+        self._linked[relation].append((source, target))
+
+    def unlink(self, relation, source, target_ids):
+        if target_ids:
+            self._unlinked[relation].append((source.pk, set(target_ids)))
+
+    def get_changed_nodes(self):
+        """
+        Returns {model: set of pks} of existing nodes which fields or links
+        are changed, they may be shared with trees of other profiles
+        """
+        created = set(
+            id(instance)
+            for instances in self._created.values() for instance in instances
+        )
+        changed = defaultdict(set)
+        for model, updated in self._updated.items():
+            changed[model].update(updated)
+        for relation, linked in self._linked.items():
+            for source, _ in linked:
+                if id(source) not in created:
+                    changed[relation.field.model].add(source.pk)
+        for relation, unlinked in self._unlinked.items():
+            changed[relation.field.model].update(
+                source_id for source_id, _ in unlinked
+            )
+        return changed
+
+    def save(self):
+        for model, instances in self._created.items():
+            model.objects.bulk_create(instances)
+
+        for model, updated in self._updated.items():
+            fields = set().union(*(fields for _, fields in updated.values()))
+            model.objects.bulk_update(
+                [instance for instance, _ in updated.values()], fields
+            )
+
+        for relation, unlinked in self._unlinked.items():
+            source_field, target_field = get_through_fields(relation)
+            relation.through.objects.filter(reduce(or_, (
+                Q(**{source_field: source_id, f'{target_field}__in': target_ids})
+                for source_id, target_ids in unlinked
+            ))).delete()
+
+        for relation, linked in self._linked.items():
+            source_field, target_field = get_through_fields(relation)
+            pairs = dict.fromkeys(
+                (source.pk, target.pk) for source, target in linked
+            )
+            relation.through.objects.bulk_create(
+                relation.through(**{source_field: source_id, target_field: target_id})
+                for source_id, target_id in pairs
+            )
@@ -0,0 +1,18 @@
+from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
+
+from standarts.tree import get_significant_prefix
+
+
+class ClassificationTreeFilter(filters.CharFilter):
+    """
+    CharFilter class for filtering objects classified
+    under passed DK021 code (including the code itself).
+    Uses prefix lookup, so it is served by varchar_pattern_ops index
+    """
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        return qs.filter(**{
+            f'{self.field_name}__startswith': get_significant_prefix(value)
+        })
@@ -0,0 +1,152 @@
+import mmap
+import os
+import struct
+from collections.abc import Mapping, Sequence
+
+
+INDEX_MAGIC = b'STDX'
+INDEX_VERSION = 3
+
+# magic, version, number of entries, number of search terms
+HEADER = struct.Struct('<4sIII')
+# key offset, key length, value offset, value length (offsets are in blob)
+ENTRY = struct.Struct('<IIII')
+# term offset, term length, key offset, key length
+TERM = struct.Struct('<IIII')
+
+
+class CompiledIndexError(Exception):
+    pass
+
+
+def compile_index(table, path, terms=()):
+    """
+    Writes mapping of strings to binary index file: header, entries sorted
+    by UTF-8 encoded key, sorted (term, key) pairs of search terms
+    and blob with keys, values and terms.
+    File is replaced atomically, so readers never see partially written index.
+    """
+    items = sorted(
+        (key.encode('utf-8'), value.encode('utf-8'))
+        for key, value in table.items()
+    )
+    entries = []
+    key_offsets = {}
+    blob = bytearray()
+    for key, value in items:
+        key_offset = key_offsets[key] = len(blob)
+        blob += key
+        value_offset = len(blob)
+        blob += value
+        entries.append(
+            ENTRY.pack(key_offset, len(key), value_offset, len(value))
+        )
+
+    term_entries = []
+    term_offsets = {}
+    for term, key in sorted(terms):
+        term = term.encode('utf-8')
+        key = key.encode('utf-8')
+        if term not in term_offsets:
+            term_offsets[term] = len(blob)
+            blob += term
+        term_entries.append(TERM.pack(
+            term_offsets[term], len(term), key_offsets[key], len(key)
+        ))
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as index_file:
+        index_file.write(HEADER.pack(
+            INDEX_MAGIC, INDEX_VERSION, len(entries), len(term_entries)
+        ))
+        index_file.write(b''.join(entries))
+        index_file.write(b''.join(term_entries))
+        index_file.write(blob)
+    os.replace(tmp_path, path)
+
+
+class CompiledIndex(Mapping):
+    """
+    Read-only mapping over memory-mapped binary index built by compile_index.
+    Lookups are binary searches over sorted keys, so pages of index file
+    are shared between all processes through the page cache.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as index_file:
+            self._buffer = mmap.mmap(
+                index_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        magic, version = struct.unpack_from('<4sI', self._buffer, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._buffer.close()
+            raise CompiledIndexError(f'{path} is not a compatible index file')
+        _, _, self._count, terms_count = HEADER.unpack_from(self._buffer, 0)
+        self._entries_offset = HEADER.size
+        terms_offset = self._entries_offset + ENTRY.size * self._count
+        self._blob_offset = terms_offset + TERM.size * terms_count
+        self.search_terms = CompiledTerms(self, terms_offset, terms_count)
+
+    def _entry(self, position):
+        return ENTRY.unpack_from(
+            self._buffer, self._entries_offset + ENTRY.size * position
+        )
+
+    def _read(self, offset, length):
+        start = self._blob_offset + offset
+        return self._buffer[start:start + length]
+
+    def _find(self, key):
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            key_offset, key_length, value_offset, value_length = self._entry(middle)
+            middle_key = self._read(key_offset, key_length)
+            if middle_key < key:
+                low = middle + 1
+            elif middle_key > key:
+                high = middle
+            else:
+                return self._read(value_offset, value_length)
+        return None
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        value = self._find(key.encode('utf-8'))
+        if value is None:
+            raise KeyError(key)
+        return value.decode('utf-8')
+
+    def __iter__(self):
+        for position in range(self._count):
+            key_offset, key_length, _, _ = self._entry(position)
+            yield self._read(key_offset, key_length).decode('utf-8')
+
+    def __len__(self):
+        return self._count
+
+
+class CompiledTerms(Sequence):
+    """
+    Sorted (term, key) pairs of search terms compiled into index file,
+    compatible with in-memory list of ClassifierSearchIndex
+    """
+    def __init__(self, index, offset, count):
+        self._index = index
+        self._offset = offset
+        self._count = count
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        term_offset, term_length, key_offset, key_length = TERM.unpack_from(
+            self._index._buffer, self._offset + TERM.size * position
+        )
+        return (
+            self._index._read(term_offset, term_length).decode('utf-8'),
+            self._index._read(key_offset, key_length).decode('utf-8'),
+        )
+
+    def __len__(self):
+        return self._count
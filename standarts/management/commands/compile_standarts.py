@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from standarts.registry import compile_reference_tables
+
+
+class Command(BaseCommand):
+    help = (
+        'Compiles classifier reference files into memory-mapped binary '
+        'indexes shared between all worker processes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory', default=settings.STANDARTS_DIR,
+            help='Directory with reference files'
+        )
+
+    def handle(self, *args, **options):
+        for index_path in compile_reference_tables(options['directory']):
+            self.stdout.write(f'Compiled {index_path}')
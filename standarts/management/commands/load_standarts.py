@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from standarts.models import Classifier, Unit
+from standarts.registry import (
+    CLASSIFICATION_REFERENCE_MAPPING, UNIT_CODES_FILENAME,
+    load_classifiers_table
+)
+
+
+def copy_rows(cursor, model, columns, rows):
+    """Streams rows into model table with single COPY statement"""
+    buffer = io.StringIO()
+    # quoted empty values are loaded as empty strings, not NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    writer.writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {model._meta.db_table} ({", ".join(columns)}) '
+        f'FROM STDIN WITH (FORMAT csv)',
+        buffer
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Replaces classifier and unit reference tables in database '
+        'with content of reference files'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory', default=settings.STANDARTS_DIR,
+            help='Directory with reference files'
+        )
+
+    def _get_classifier_rows(self, directory):
+        for scheme, filename in CLASSIFICATION_REFERENCE_MAPPING.items():
+            table = load_classifiers_table(os.path.join(directory, filename))
+            for code, description in table.items():
+                yield scheme, code, description
+
+    def _get_unit_rows(self, directory):
+        with open(os.path.join(directory, UNIT_CODES_FILENAME), 'r') as json_file:
+            unit_codes = json.loads(json_file.read())
+        for code, unit in unit_codes.items():
+            yield code, unit['name'], unit.get('symbol', '')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'TRUNCATE {Classifier._meta.db_table}, {Unit._meta.db_table}'
+            )
+            copy_rows(
+                cursor, Classifier, ('scheme', 'code', 'description'),
+                self._get_classifier_rows(directory)
+            )
+            copy_rows(
+                cursor, Unit, ('code', 'name', 'symbol'),
+                self._get_unit_rows(directory)
+            )
+
+        self.stdout.write(
+            f'Loaded {Classifier.objects.count()} classifiers '
+            f'and {Unit.objects.count()} units'
+        )
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Classifier',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scheme', models.CharField(max_length=15)),
+                ('code', models.CharField(max_length=20)),
+                ('description', models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Unit',
+            fields=[
+                ('code', models.CharField(max_length=5, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('symbol', models.CharField(blank=True, max_length=50)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='classifier',
+            constraint=models.UniqueConstraint(fields=('scheme', 'code'), name='standarts_classifier_scheme_code'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class Classifier(models.Model):
+    """Entry of classifier reference file loaded by load_standarts command"""
+    scheme = models.CharField(max_length=15)
+    code = models.CharField(max_length=20)
+    description = models.TextField()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('scheme', 'code'), name='standarts_classifier_scheme_code'
+            ),
+        )
+
+    def __str__(self):
+        return f'<Classifier {self.scheme} {self.code}>'
+
+
+class Unit(models.Model):
+    """Entry of unit codes reference file loaded by load_standarts command"""
+    code = models.CharField(max_length=5, primary_key=True)
+    name = models.CharField(max_length=100)
+    symbol = models.CharField(max_length=50, blank=True)
+
+    def __str__(self):
+        return f'<Unit {self.code}>'
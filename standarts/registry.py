@@ -0,0 +1,308 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from threading import Lock, Thread
+from types import MappingProxyType
+
+from django.conf import settings
+
+from standarts.index import CompiledIndex, CompiledIndexError, compile_index
+from standarts.search import ClassifierSearchIndex, build_search_terms
+from standarts.tree import CLASSIFICATION_TREE_SCHEMES, ClassificationTree
+
+
+STANDARTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CLASSIFICATION_REFERENCE_MAPPING = {
+    'ДК021': 'classifiers_dk021_uk.json',
+    'CPV_EN': 'classifiers_cpv_en.json',
+    'CPV_RU': 'classifiers_cpv_ru.json',
+    'ДК003': 'classifiers_dk003_uk.json',
+    'ДК015': 'classifiers_dk015_uk.json',
+    'ДК018': 'classifiers_dk018_uk.json',
+    'КЕКВ': 'classifiers_kekv_uk.json',
+    'NONE': 'classifiers_none_uk.json',
+    'specialNorms': 'classifiers_special_norms_uk.json',
+    'UA-ROAD': 'classifiers_ua_road.json',
+    'GMDN': 'classifiers_gmdn.json',
+}
+
+STANDART_CLASSIFICATION_REFERENCE_SCHEMES = (
+    'ДК003', 'ДК015', 'ДК018', 'ДК021', 'specialNorms', 'UA-ROAD',
+    'GMDN', 'CPV_EN', 'CPV_RU', 'NONE'
+)
+
+UNIT_CODES_FILENAME = 'unit_codes_all.json'
+
+COMPILED_INDEX_DIRNAME = 'compiled'
+
+logger = logging.getLogger(__name__)
+
+ReferenceFileVersion = namedtuple('ReferenceFileVersion', ('mtimes', 'digest'))
+
+
+def load_classifiers_table(path):
+    """Reads classifier reference file into read-only mapping id -> description"""
+    with open(path, 'r') as json_file:
+        return MappingProxyType(json.loads(json_file.read()))
+
+
+def load_units_table(path):
+    """Reads unit codes reference file into read-only mapping code -> name"""
+    with open(path, 'r') as json_file:
+        unit_codes = json.loads(json_file.read())
+    return MappingProxyType({
+        code: unit['name'] for code, unit in unit_codes.items()
+    })
+
+
+REFERENCE_TABLE_LOADERS = {
+    filename: load_classifiers_table
+    for filename in CLASSIFICATION_REFERENCE_MAPPING.values()
+}
+REFERENCE_TABLE_LOADERS[UNIT_CODES_FILENAME] = load_units_table
+
+
+def get_compiled_index_path(directory, filename):
+    name, _ = os.path.splitext(filename)
+    return os.path.join(directory, COMPILED_INDEX_DIRNAME, f'{name}.idx')
+
+
+def load_compiled_index(index_path, source_path):
+    """
+    Returns compiled index for reference file
+    or None if it was not built or is older than reference file
+    """
+    try:
+        if os.path.getmtime(index_path) < os.path.getmtime(source_path):
+            return None
+        return CompiledIndex(index_path)
+    except (OSError, CompiledIndexError):
+        return None
+
+
+def get_reference_file_version(directory, filename, previous=None):
+    """
+    Returns version of reference file and its compiled index.
+    Content hash is calculated only when modification time was changed,
+    so touched but not changed files keep their digest
+    """
+    paths = (
+        os.path.join(directory, filename),
+        get_compiled_index_path(directory, filename),
+    )
+    mtimes = tuple(
+        os.path.getmtime(path) if os.path.exists(path) else None
+        for path in paths
+    )
+    if previous is not None and previous.mtimes == mtimes:
+        return previous
+
+    digest = hashlib.sha256()
+    for path, mtime in zip(paths, mtimes):
+        if mtime is None:
+            continue
+        with open(path, 'rb') as reference_file:
+            for chunk in iter(lambda: reference_file.read(65536), b''):
+                digest.update(chunk)
+    return ReferenceFileVersion(mtimes, digest.hexdigest())
+
+
+def compile_reference_tables(directory=STANDARTS_DIR):
+    """
+    Builds binary index for every reference file, returns built paths.
+    Indexes of classifiers include sorted terms of their search indexes
+    """
+    os.makedirs(os.path.join(directory, COMPILED_INDEX_DIRNAME), exist_ok=True)
+    classifier_filenames = set(CLASSIFICATION_REFERENCE_MAPPING.values())
+    index_paths = []
+    for filename, loader in REFERENCE_TABLE_LOADERS.items():
+        index_path = get_compiled_index_path(directory, filename)
+        table = loader(os.path.join(directory, filename))
+        terms = (
+            build_search_terms(table)
+            if filename in classifier_filenames else ()
+        )
+        compile_index(table, index_path, terms)
+        index_paths.append(index_path)
+    return index_paths
+
+
+class ReferenceData:
+    """
+    Snapshot of loaded reference tables, versions of their files
+    and structures built over them (trees, search indexes)
+    """
+    def __init__(self, tables=None, versions=None, structures=None):
+        self.tables = tables or {}
+        self.versions = versions or {}
+        self.structures = structures or {}
+
+
+class ClassifierRegistry:
+    """
+    Process-wide storage of classifier reference tables.
+    Every reference file is parsed only once, on first access,
+    and kept as immutable lookup table until the file is changed.
+    When compiled index exists for reference file it is memory-mapped
+    instead of parsing JSON (see compile_standarts management command).
+
+    Changed files are picked up by reload(), which builds new tables aside
+    and swaps the whole snapshot at once, so readers are never blocked.
+    """
+    def __init__(self, directory=None):
+        self._directory = directory
+        self._data = ReferenceData()
+        self._lock = Lock()
+        self._reload_lock = Lock()
+
+    @property
+    def directory(self):
+        return self._directory or getattr(
+            settings, 'STANDARTS_DIR', STANDARTS_DIR
+        )
+
+    def _load_table(self, filename):
+        source_path = os.path.join(self.directory, filename)
+        table = load_compiled_index(
+            get_compiled_index_path(self.directory, filename), source_path
+        )
+        if table is None:
+            table = REFERENCE_TABLE_LOADERS[filename](source_path)
+        return table
+
+    def _get_table(self, filename, data=None):
+        """Returns table of passed snapshot, of current one by default"""
+        try:
+            return (data or self._data).tables[filename]
+        except KeyError:
+            pass
+        with self._lock:
+            data = data or self._data
+            if filename not in data.tables:
+                # version is taken before reading, so changes made
+                # while loading are picked up by the next reload
+                data.versions[filename] = get_reference_file_version(
+                    self.directory, filename
+                )
+                data.tables[filename] = self._load_table(filename)
+            return data.tables[filename]
+
+    def get_classifiers(self, scheme):
+        """Returns lookup table for scheme, raises KeyError for unknown one"""
+        return self._get_table(CLASSIFICATION_REFERENCE_MAPPING[scheme])
+
+    def _get_classifiers_structure(self, factory, scheme):
+        key = (factory, scheme)
+        # table and structure are taken from one snapshot, so structure
+        # over table replaced by reload() is never cached in a newer one
+        data = self._data
+        try:
+            return data.structures[key]
+        except KeyError:
+            pass
+        classifiers = self._get_table(
+            CLASSIFICATION_REFERENCE_MAPPING[scheme], data
+        )
+        with self._lock:
+            if key not in data.structures:
+                data.structures[key] = factory(classifiers)
+            return data.structures[key]
+
+    def get_classification_tree(self, scheme):
+        """Returns hierarchy of codes for DK021 and CPV schemes"""
+        if scheme not in CLASSIFICATION_TREE_SCHEMES:
+            raise KeyError(scheme)
+        return self._get_classifiers_structure(ClassificationTree, scheme)
+
+    def get_search_index(self, scheme):
+        """
+        Returns prefix search index over codes and descriptions,
+        which is built on first call unless its terms were compiled
+        """
+        return self._get_classifiers_structure(ClassifierSearchIndex, scheme)
+
+    def get_units(self):
+        return self._get_table(UNIT_CODES_FILENAME)
+
+    def load(self):
+        """Loads all reference tables at once"""
+        for filename in REFERENCE_TABLE_LOADERS:
+            self._get_table(filename)
+
+    def reload(self):
+        """
+        Rebuilds loaded tables which files were changed since loading
+        together with structures built over them, then swaps them in.
+        Returns filenames of reloaded tables
+        """
+        with self._reload_lock:
+            data = self._data
+            versions = {}
+            tables = {}
+            for filename, version in list(data.versions.items()):
+                new_version = get_reference_file_version(
+                    self.directory, filename, version
+                )
+                if new_version == version:
+                    continue
+                versions[filename] = new_version
+                if new_version.digest != version.digest:
+                    tables[filename] = self._load_table(filename)
+
+            structures = {}
+            for (factory, scheme), structure in list(data.structures.items()):
+                filename = CLASSIFICATION_REFERENCE_MAPPING[scheme]
+                if filename in tables:
+                    structures[(factory, scheme)] = factory(tables[filename])
+
+            if versions:
+                with self._lock:
+                    data = self._data
+                    # structures built over replaced tables after
+                    # structures were listed above are dropped
+                    kept_structures = {
+                        (factory, scheme): structure
+                        for (factory, scheme), structure
+                        in data.structures.items()
+                        if CLASSIFICATION_REFERENCE_MAPPING[scheme]
+                        not in tables
+                    }
+                    self._data = ReferenceData(
+                        {**data.tables, **tables},
+                        {**data.versions, **versions},
+                        {**kept_structures, **structures},
+                    )
+            return list(tables)
+
+    def start_reloading(self, interval):
+        """Starts background thread checking reference files for changes"""
+        reloader = ReferenceDataReloader(self, interval)
+        reloader.start()
+        return reloader
+
+
+class ReferenceDataReloader(Thread):
+    def __init__(self, registry, interval):
+        super().__init__(name='reference-data-reloader', daemon=True)
+        self.registry = registry
+        self.interval = interval
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                reloaded = self.registry.reload()
+            except Exception:
+                logger.exception('Failed to reload reference data')
+            else:
+                if reloaded:
+                    logger.info(
+                        'Reloaded reference data: %s', ', '.join(reloaded)
+                    )
+
+
+registry = ClassifierRegistry()
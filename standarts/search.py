@@ -0,0 +1,99 @@
+import re
+from bisect import bisect_left
+
+
+WORD_REGEX = re.compile(r'\w+')
+MAX_CHARACTER = chr(0x10ffff)
+# whole codes are stored with this prefix, so they are sorted before words
+# and codes starting with query are found without scanning words
+CODE_TERM_PREFIX = '\0'
+
+
+def get_search_terms(text):
+    return WORD_REGEX.findall(text.casefold())
+
+
+def build_search_terms(table):
+    """Returns sorted (term, code) pairs of codes and description words"""
+    terms = set()
+    for code, description in table.items():
+        terms.add((CODE_TERM_PREFIX + code.casefold(), code))
+        for word in get_search_terms(code) + get_search_terms(description):
+            terms.add((word, code))
+    return sorted(terms)
+
+
+class ClassifierSearchIndex:
+    """
+    Prefix search over codes and description words of classifier table.
+    Terms are kept in one sorted array, so every lookup is a binary search
+    followed by a scan over matching terms only. Terms compiled into
+    memory-mapped index (see standarts.index) are used without copying.
+    """
+    def __init__(self, table):
+        self._table = table
+        self._terms = getattr(table, 'search_terms', None) or (
+            build_search_terms(table)
+        )
+
+    def _get_range(self, prefix):
+        """Returns bounds of terms which start with prefix"""
+        return (
+            bisect_left(self._terms, (prefix, '')),
+            bisect_left(self._terms, (prefix + MAX_CHARACTER, '')),
+        )
+
+    def _get_code_terms(self, code):
+        return (
+            [code.casefold()] + get_search_terms(code) +
+            get_search_terms(self._table[code])
+        )
+
+    def search(self, query, limit=10):
+        """
+        Returns up to limit (code, description) pairs
+        which code or description words start with every word of query.
+        Codes starting with the whole query go first (exact match first,
+        then in order of codes), other results follow in order of matched
+        words, they are not ranked by relevance
+        """
+        query = query.strip().casefold()
+        if not query:
+            return []
+
+        start, end = self._get_range(CODE_TERM_PREFIX + query)
+        codes = [
+            self._terms[position][1]
+            for position in range(start, min(end, start + limit))
+        ]
+        results = [(code, self._table[code]) for code in codes]
+        if len(results) >= limit:
+            return results
+
+        words = set(get_search_terms(query)) or {query}
+        # scanning terms of the most selective word only
+        ranges = {word: self._get_range(word) for word in words}
+        first_word = min(
+            ranges, key=lambda word: ranges[word][1] - ranges[word][0]
+        )
+        other_words = words - {first_word}
+        start, end = ranges[first_word]
+
+        seen_codes = set(codes)
+        for position in range(start, end):
+            code = self._terms[position][1]
+            if code in seen_codes:
+                continue
+            seen_codes.add(code)
+
+            if other_words:
+                code_terms = self._get_code_terms(code)
+                if not all(
+                    any(term.startswith(word) for term in code_terms)
+                    for word in other_words
+                ):
+                    continue
+            results.append((code, self._table[code]))
+            if len(results) >= limit:
+                break
+        return results
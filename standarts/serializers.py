@@ -1,22 +1,39 @@
 from django.core.validators import RegexValidator
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 
-from standarts.validators import StandartsByReferenceValidator
+from standarts.validators import validate_classification, validate_unit
 
 
-class UnitSerializer(serializers.Serializer):
+# context key of list serializers which check reference data
+# of all items at once, nested serializers of items skip the check then
+BATCH_REFERENCE_CHECKS = 'batch_reference_checks'
+
+
+class ReferenceDataSerializer(serializers.Serializer):
+    """
+    Checks validated data against reference table with validate_reference(),
+    unless reference data of all items is checked by list serializer
+    """
+    def validate(self, data):
+        if self.context.get(BATCH_REFERENCE_CHECKS):
+            return data
+        return self.validate_reference(data)
+
+
+class UnitSerializer(ReferenceDataSerializer):
     name = serializers.CharField(max_length=100)
     code = serializers.CharField(max_length=5, required=True)
 
-    def validate(self, data):
-        return StandartsByReferenceValidator(data).validate_unit()
+    def validate_reference(self, data):
+        return validate_unit(data)
 
 
-class BaseClassificationSerializer(serializers.Serializer):
+class BaseClassificationSerializer(ReferenceDataSerializer):
     description = serializers.CharField(max_length=255)
 
-    def validate(self, data):
-        return StandartsByReferenceValidator(data).validate_classifiers()
+    def validate_reference(self, data):
+        return validate_classification(data)
 
 
 class ClassificationSerializer(BaseClassificationSerializer):
@@ -36,3 +53,27 @@ class ClassificationSerializer(BaseClassificationSerializer):
 class AdditionalClassificationSerializer(BaseClassificationSerializer):
     id = serializers.CharField(max_length=10)
     scheme = serializers.CharField(max_length=15)
+
+
+class ReferenceValidationClassificationSerializer(serializers.Serializer):
+    scheme = serializers.CharField(max_length=15)
+    id = serializers.CharField(max_length=10)
+
+
+class ReferenceValidationSerializer(serializers.Serializer):
+    MAX_ITEMS = 1000
+
+    classifications = ReferenceValidationClassificationSerializer(
+        many=True, required=False
+    )
+    units = serializers.ListField(
+        child=serializers.CharField(max_length=5), required=False,
+        max_length=MAX_ITEMS
+    )
+
+    def validate_classifications(self, value):
+        if len(value) > self.MAX_ITEMS:
+            raise ValidationError(
+                f'Ensure this field has no more than {self.MAX_ITEMS} elements.'
+            )
+        return value
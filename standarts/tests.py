@@ -0,0 +1,391 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from passlib.apache import HtpasswdFile
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from standarts.index import CompiledIndex, compile_index
+from standarts.models import Classifier, Unit
+from standarts.registry import (
+    CLASSIFICATION_REFERENCE_MAPPING, COMPILED_INDEX_DIRNAME, STANDARTS_DIR,
+    UNIT_CODES_FILENAME, ClassifierRegistry, get_compiled_index_path,
+    load_classifiers_table, load_units_table
+)
+from standarts.search import ClassifierSearchIndex, build_search_terms
+from standarts.tree import get_significant_prefix
+from standarts.validators import validate_classification, validate_unit
+
+API_URL = '/api/0/classifiers/'
+
+USER_CREDENTIALS = {
+    'admin': 'adminpassword',
+    'user': 'userpassword',
+}
+
+
+class TestClassifierRegistry(SimpleTestCase):
+    def test_tables_loaded_once(self):
+        registry = ClassifierRegistry()
+        classifiers = registry.get_classifiers('ДК021')
+        self.assertIs(registry.get_classifiers('ДК021'), classifiers)
+        self.assertEqual(
+            classifiers['92350000-9'],
+            'Послуги гральних закладів і тоталізаторів'
+        )
+        self.assertEqual(registry.get_units()['WW'], 'millilitre of water')
+        with self.assertRaises(TypeError):
+            classifiers['92350000-9'] = 'foo'
+        with self.assertRaises(KeyError):
+            registry.get_classifiers('foo')
+
+    def test_compiled_index(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        index_path = os.path.join(directory, 'test.idx')
+        table = {'b': 'Б', 'a': 'А', 'ґ': 'Ґ'}
+        compile_index(table, index_path)
+        index = CompiledIndex(index_path)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(list(index), ['a', 'b', 'ґ'])
+        for key, value in table.items():
+            self.assertEqual(index[key], value)
+        self.assertNotIn('c', index)
+
+        # registry uses compiled index only when it exists
+        shutil.copy(os.path.join(STANDARTS_DIR, UNIT_CODES_FILENAME), directory)
+        self.assertNotIsInstance(
+            ClassifierRegistry(directory).get_units(), CompiledIndex
+        )
+        os.mkdir(os.path.join(directory, COMPILED_INDEX_DIRNAME))
+        compile_index(
+            load_units_table(os.path.join(directory, UNIT_CODES_FILENAME)),
+            get_compiled_index_path(directory, UNIT_CODES_FILENAME)
+        )
+        units = ClassifierRegistry(directory).get_units()
+        self.assertIsInstance(units, CompiledIndex)
+        self.assertEqual(units['WW'], 'millilitre of water')
+
+    def test_compiled_search_terms(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = CLASSIFICATION_REFERENCE_MAPPING['ДК021']
+        shutil.copy(os.path.join(STANDARTS_DIR, filename), directory)
+        search_index = ClassifierRegistry(directory).get_search_index('ДК021')
+
+        os.mkdir(os.path.join(directory, COMPILED_INDEX_DIRNAME))
+        table = load_classifiers_table(os.path.join(directory, filename))
+        compile_index(
+            table, get_compiled_index_path(directory, filename),
+            build_search_terms(table)
+        )
+        registry = ClassifierRegistry(directory)
+        classifiers = registry.get_classifiers('ДК021')
+        self.assertEqual(
+            list(classifiers.search_terms), build_search_terms(classifiers)
+        )
+        compiled_search_index = registry.get_search_index('ДК021')
+        self.assertIs(compiled_search_index._terms, classifiers.search_terms)
+        for query in ('9235', 'гральних', 'послуги тоталіз', 'foo'):
+            self.assertEqual(
+                compiled_search_index.search(query),
+                search_index.search(query)
+            )
+
+    def test_classification_tree(self):
+        self.assertEqual(get_significant_prefix('92350000-9'), '9235')
+        self.assertEqual(get_significant_prefix('03000000-1'), '03')
+        self.assertEqual(get_significant_prefix('0311'), '0311')
+
+        tree = ClassifierRegistry().get_classification_tree('ДК021')
+        self.assertIn('92350000-9', tree)
+        self.assertNotIn('92350000-1', tree)
+        self.assertEqual(
+            tree.ancestors('92350000-9'), ['92000000-1', '92300000-4']
+        )
+        self.assertEqual(tree.parent('92000000-1'), None)
+        self.assertEqual(
+            tree.children('92350000-9'), ['92351000-6', '92352000-3']
+        )
+        self.assertIn('92351100-7', tree.descendants('92350000-9'))
+        self.assertIn('92350000-9', tree.children('92300000-4'))
+        self.assertNotIn('92351000-6', tree.children('92300000-4'))
+        with self.assertRaises(KeyError):
+            ClassifierRegistry().get_classification_tree('GMDN')
+
+    def test_reload(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, CLASSIFICATION_REFERENCE_MAPPING['КЕКВ'])
+
+        def write_reference_file(data, mtime):
+            with open(path, 'w') as json_file:
+                json.dump(data, json_file)
+            os.utime(path, (mtime, mtime))
+
+        write_reference_file({'2000': 'Поточні видатки'}, 1000)
+        registry = ClassifierRegistry(directory)
+        classifiers = registry.get_classifiers('КЕКВ')
+        search_index = registry.get_search_index('КЕКВ')
+        self.assertEqual(registry.reload(), [])
+
+        # touched file with the same content is not reloaded
+        write_reference_file({'2000': 'Поточні видатки'}, 2000)
+        self.assertEqual(registry.reload(), [])
+        self.assertIs(registry.get_classifiers('КЕКВ'), classifiers)
+
+        write_reference_file(
+            {'2000': 'Поточні видатки', '2100': 'Оплата праці'}, 3000
+        )
+        self.assertEqual(registry.reload(), ['classifiers_kekv_uk.json'])
+        self.assertEqual(
+            registry.get_classifiers('КЕКВ')['2100'], 'Оплата праці'
+        )
+        self.assertEqual(
+            registry.get_search_index('КЕКВ').search('оплата'),
+            [('2100', 'Оплата праці')]
+        )
+        # tables taken before reload stay untouched
+        self.assertNotIn('2100', classifiers)
+        self.assertEqual(search_index.search('оплата'), [])
+
+    def test_reload_while_building_structure(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, CLASSIFICATION_REFERENCE_MAPPING['КЕКВ'])
+        with open(path, 'w') as json_file:
+            json.dump({'2000': 'Поточні видатки'}, json_file)
+        registry = ClassifierRegistry(directory)
+        registry.get_classifiers('КЕКВ')
+        get_table = registry._get_table
+
+        def get_table_and_reload(*args):
+            # file is changed and reloaded right after table was taken
+            table = get_table(*args)
+            with open(path, 'w') as json_file:
+                json.dump({'2100': 'Оплата праці'}, json_file)
+            registry.reload()
+            return table
+
+        with mock.patch.object(
+            registry, '_get_table', side_effect=get_table_and_reload
+        ):
+            registry.get_search_index('КЕКВ')
+        self.assertEqual(
+            registry.get_search_index('КЕКВ').search('оплата'),
+            [('2100', 'Оплата праці')]
+        )
+
+
+class TestValidators(SimpleTestCase):
+    def test_validate_classification(self):
+        data = {
+            'id': '92350000-9', 'scheme': 'ДК021',
+            'description': 'Послуги гральних закладів і тоталізаторів'
+        }
+        self.assertIs(validate_classification(data), data)
+
+        data = {'id': '92350000-9', 'scheme': 'ДК021', 'description': 'foo'}
+        validated_data = validate_classification(data)
+        self.assertEqual(
+            validated_data['description'],
+            'Послуги гральних закладів і тоталізаторів'
+        )
+        self.assertEqual(data['description'], 'foo')
+
+        data = {'id': '1', 'scheme': 'КЕКВ', 'description': 'foo'}
+        self.assertIs(validate_classification(data), data)
+
+        for data in (
+            {'id': '22222222-1', 'scheme': 'ДК021'},
+            {'id': '1', 'scheme': 'foo'},
+        ):
+            with self.assertRaises(ValidationError):
+                validate_classification(data)
+
+    def test_validate_unit(self):
+        data = {'code': 'WW', 'name': 'millilitre of water'}
+        self.assertIs(validate_unit(data), data)
+
+        data = {'code': 'WW', 'name': 'foo'}
+        self.assertEqual(validate_unit(data)['name'], 'millilitre of water')
+        self.assertEqual(data['name'], 'foo')
+
+        for data in ({'code': 'foo'}, {'name': 'foo'}):
+            with self.assertRaises(ValidationError):
+                validate_unit(data)
+
+
+class TestClassifierSearch(APITestCase):
+    def setUp(self):
+        ht = HtpasswdFile(settings.PATH_TO_HTPASSWD_FILE, new=True)
+        for username, password in USER_CREDENTIALS.items():
+            ht.set_password(username, password)
+        ht.save()
+
+        user_token = list(USER_CREDENTIALS.values())[1]
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {user_token}'
+        )
+
+    def tearDown(self):
+        os.remove(settings.PATH_TO_HTPASSWD_FILE)
+
+    def test_search(self):
+        get_response = self.client.get(
+            path=f'{API_URL}ДК021/', data={'q': '9235', 'limit': 2}
+        )
+        self.assertEqual(get_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_response.json()['results'], [
+            {
+                'id': '92350000-9',
+                'scheme': 'ДК021',
+                'description': 'Послуги гральних закладів і тоталізаторів'
+            },
+            {
+                'id': '92351000-6',
+                'scheme': 'ДК021',
+                'description': 'Послуги гральних закладів'
+            },
+        ])
+
+        # every word of query must match code or description word
+        results = self.client.get(
+            path=f'{API_URL}ДК021/', data={'q': 'граль послуги'}
+        ).json()['results']
+        self.assertIn('92350000-9', [result['id'] for result in results])
+        for result in results:
+            self.assertIn('граль', result['description'].lower())
+
+        results = self.client.get(
+            path=f'{API_URL}GMDN/', data={'q': 'щипці'}
+        ).json()['results']
+        self.assertEqual(len(results), 10)
+
+        results = self.client.get(
+            path=f'{API_URL}ДК021/', data={'q': ''}
+        ).json()['results']
+        self.assertEqual(results, [])
+
+    def test_search_ranking(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        index_path = os.path.join(directory, 'test.idx')
+        table = {'1': 'Bar 12', '12': 'Foo', '123': 'Baz', '13': 'Qux'}
+        compile_index(table, index_path, build_search_terms(table))
+        compiled_table = CompiledIndex(index_path)
+
+        # codes starting with query go first, exact match first
+        for search_index in (
+            ClassifierSearchIndex(table), ClassifierSearchIndex(compiled_table)
+        ):
+            self.assertEqual(
+                [code for code, _ in search_index.search('12')],
+                ['12', '123', '1']
+            )
+            self.assertEqual(
+                [code for code, _ in search_index.search('12', limit=2)],
+                ['12', '123']
+            )
+            self.assertEqual(search_index.search('qux'), [('13', 'Qux')])
+
+    def test_search_errors(self):
+        self.assertEqual(
+            self.client.get(path=f'{API_URL}foo/', data={'q': '1'}).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+        self.assertEqual(
+            self.client.get(
+                path=f'{API_URL}ДК021/', data={'q': '1', 'limit': 'foo'}
+            ).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.client.credentials()
+        self.assertEqual(
+            self.client.get(path=f'{API_URL}ДК021/', data={'q': '1'}).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_batch_validation(self):
+        post_response = self.client.post(
+            path=f'{API_URL}validate/',
+            data={
+                'classifications': [
+                    {'scheme': 'ДК021', 'id': '92350000-9'},
+                    {'scheme': 'GMDN', 'id': '11785'},
+                    {'scheme': 'ДК021', 'id': '22222222-1'},
+                    {'scheme': 'foo', 'id': '1'},
+                    {'scheme': 'КЕКВ', 'id': '1'},
+                ],
+                'units': ['WW', 'foo'],
+            },
+            format='json'
+        )
+        self.assertEqual(post_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(post_response.json(), {
+            'classifications': [
+                {
+                    'scheme': 'ДК021', 'id': '92350000-9', 'valid': True,
+                    'description': 'Послуги гральних закладів і тоталізаторів'
+                },
+                {
+                    'scheme': 'GMDN', 'id': '11785', 'valid': True,
+                    'description': 'Кишкові щипці'
+                },
+                {
+                    'scheme': 'ДК021', 'id': '22222222-1', 'valid': False,
+                    'errors': {'code': 'Wrong id'}
+                },
+                {
+                    'scheme': 'foo', 'id': '1', 'valid': False,
+                    'errors': {'scheme': 'Unknown scheme'}
+                },
+                {'scheme': 'КЕКВ', 'id': '1', 'valid': True},
+            ],
+            'units': [
+                {'code': 'WW', 'valid': True, 'name': 'millilitre of water'},
+                {'code': 'foo', 'valid': False, 'errors': {'code': 'Wrong code'}},
+            ]
+        })
+
+        self.assertEqual(
+            self.client.post(
+                path=f'{API_URL}validate/',
+                data={'classifications': [{'id': '1'}]},
+                format='json'
+            ).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+
+class TestLoadStandarts(TestCase):
+    def test_load_standarts(self):
+        Classifier.objects.create(scheme='foo', code='bar', description='baz')
+
+        call_command('load_standarts', stdout=io.StringIO())
+        registry = ClassifierRegistry()
+        for scheme in CLASSIFICATION_REFERENCE_MAPPING:
+            self.assertEqual(
+                Classifier.objects.filter(scheme=scheme).count(),
+                len(registry.get_classifiers(scheme))
+            )
+        self.assertFalse(Classifier.objects.filter(scheme='foo').exists())
+        self.assertEqual(
+            Classifier.objects.get(scheme='ДК021', code='92350000-9').description,
+            'Послуги гральних закладів і тоталізаторів'
+        )
+        self.assertEqual(Unit.objects.count(), len(registry.get_units()))
+        self.assertEqual(Unit.objects.get(code='WW').name, 'millilitre of water')
+
+        # loading is repeatable
+        call_command('load_standarts', stdout=io.StringIO())
+        self.assertEqual(Unit.objects.count(), len(registry.get_units()))
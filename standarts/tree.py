@@ -0,0 +1,77 @@
+import re
+from bisect import bisect_left
+
+
+CLASSIFICATION_TREE_SCHEMES = ('ДК021', 'CPV_EN', 'CPV_RU')
+
+CLASSIFICATION_CODE_REGEX = re.compile(r'^(\d{8})-\d$')
+MIN_SIGNIFICANT_DIGITS = 2
+
+
+def get_significant_prefix(code):
+    """
+    Returns digits which place code in classification tree:
+    '92350000-9' -> '9235', '03000000-1' -> '03'.
+    Values which are not full codes are treated as prefixes already.
+    """
+    match = CLASSIFICATION_CODE_REGEX.match(code)
+    if not match:
+        return code
+    digits = match.group(1).rstrip('0')
+    return digits.ljust(MIN_SIGNIFICANT_DIGITS, '0')
+
+
+class ClassificationTree:
+    """
+    Hierarchy of DK021/CPV codes built by their significant digits.
+    Code is a descendant of other code when its significant prefix starts
+    with significant prefix of the other one.
+    """
+    def __init__(self, table):
+        self._codes = {}
+        for code in table:
+            if CLASSIFICATION_CODE_REGEX.match(code):
+                self._codes[get_significant_prefix(code)] = code
+        self._prefixes = sorted(self._codes)
+
+    def __contains__(self, code):
+        return self._codes.get(get_significant_prefix(code)) == code
+
+    def __len__(self):
+        return len(self._prefixes)
+
+    def parent(self, code):
+        prefix = get_significant_prefix(code)
+        for length in range(len(prefix) - 1, MIN_SIGNIFICANT_DIGITS - 1, -1):
+            parent_code = self._codes.get(prefix[:length])
+            if parent_code:
+                return parent_code
+        return None
+
+    def ancestors(self, code):
+        """Returns ancestors of code starting from the root"""
+        ancestors = []
+        parent_code = self.parent(code)
+        while parent_code:
+            ancestors.append(parent_code)
+            parent_code = self.parent(parent_code)
+        return ancestors[::-1]
+
+    def descendants(self, code):
+        """Returns all codes under passed one in tree order"""
+        prefix = get_significant_prefix(code)
+        position = bisect_left(self._prefixes, prefix)
+        descendants = []
+        for index in range(position, len(self._prefixes)):
+            descendant_prefix = self._prefixes[index]
+            if not descendant_prefix.startswith(prefix):
+                break
+            if descendant_prefix != prefix:
+                descendants.append(self._codes[descendant_prefix])
+        return descendants
+
+    def children(self, code):
+        return [
+            descendant for descendant in self.descendants(code)
+            if self.parent(descendant) == code
+        ]
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from standarts.views import ClassifierSearchView, ReferenceValidationView
+
+
+urlpatterns = [
+    path('validate/', ReferenceValidationView.as_view()),
+    path('<str:scheme>/', ClassifierSearchView.as_view()),
+]
@@ -1,64 +1,131 @@
-import json
-from copy import deepcopy
+from collections import defaultdict
 
 from rest_framework.exceptions import ValidationError
 
-
-CLASSIFICATION_REFERENCE_MAPPING = {
-    'ДК021': 'classifiers_dk021_uk.json',
-    'CPV_EN': 'classifiers_cpv_en.json',
-    'CPV_RU': 'classifiers_cpv_ru.json',
-    'ДК003': 'classifiers_dk003_uk.json',
-    'ДК015': 'classifiers_dk015_uk.json',
-    'ДК018': 'classifiers_dk018_uk.json',
-    'КЕКВ': 'classifiers_kekv_uk.json',
-    'NONE': 'classifiers_none_uk.json',
-    'specialNorms': 'classifiers_special_norms_uk.json',
-    'UA-ROAD': 'classifiers_ua_road.json',
-    'GMDN': 'classifiers_gmdn.json',
-}
-
-STANDART_CLASSIFICATION_REFERENCE_SCHEMES = (
-    'ДК003', 'ДК015', 'ДК018', 'ДК021', 'specialNorms', 'UA-ROAD',
-    'GMDN', 'CPV_EN', 'CPV_RU', 'NONE'
+from standarts.registry import (
+    CLASSIFICATION_REFERENCE_MAPPING,
+    STANDART_CLASSIFICATION_REFERENCE_SCHEMES, registry
 )
 
 
+def check_scheme(scheme):
+    if scheme not in CLASSIFICATION_REFERENCE_MAPPING:
+        raise ValidationError({'scheme': 'Unknown scheme'})
+
+
+def get_classification_description(classification_codes, classification_id):
+    try:
+        return classification_codes[classification_id]
+    except KeyError:
+        raise ValidationError({'code': 'Wrong id'})
+
+
+def get_unit_name(unit_codes, unit_code):
+    try:
+        return unit_codes[unit_code]
+    except KeyError:
+        raise ValidationError({'code': 'Wrong code'})
+
+
+def validate_classification(data):
+    """
+    Checks classification id against reference table of its scheme.
+    Passed data is never changed: new dict is returned only when
+    description differs from the one in reference table
+    """
+    scheme = data['scheme']
+    check_scheme(scheme)
+    if scheme not in STANDART_CLASSIFICATION_REFERENCE_SCHEMES:
+        return data
+
+    description = get_classification_description(
+        registry.get_classifiers(scheme), data['id']
+    )
+    if data.get('description') == description:
+        return data
+    return dict(data, description=description)
+
+
+def validate_unit(data):
+    """
+    Checks unit code against reference table.
+    New dict is returned only when name differs from reference one
+    """
+    try:
+        unit_code = data['code']
+    except KeyError:
+        raise ValidationError({'code': 'Code is required'})
+
+    name = get_unit_name(registry.get_units(), unit_code)
+    if data.get('name') == name:
+        return data
+    return dict(data, name=name)
+
+
 class StandartsByReferenceValidator:
+    """Object interface for validate_classification and validate_unit"""
     def __init__(self, data):
-        self.data = deepcopy(data)
+        self.data = data
 
-    def _validate_classifiers_by_standarts_default(self, filename):
-        with open(f'standarts/{filename}', 'r') as json_file:
-            classification_codes = json.loads(json_file.read())
-            try:
-                classification_name = classification_codes[self.data['id']]
-            except KeyError:
-                raise ValidationError({'code': 'Wrong id'})
-        self.data['description'] = classification_name
+    def validate_unit(self):
+        return validate_unit(self.data)
+
+    def validate_classifiers(self):
+        return validate_classification(self.data)
+
+
+def validate_classifiers_batch(classifications):
+    """
+    Checks list of {'scheme': ..., 'id': ...} dicts against reference tables.
+    Items are grouped by scheme, so every reference table is fetched once.
+    Returns result for every item in passed order
+    """
+    positions_by_scheme = defaultdict(list)
+    for position, classification in enumerate(classifications):
+        positions_by_scheme[classification['scheme']].append(position)
 
-    def validate_unit(self,):
+    results = [None] * len(classifications)
+    for scheme, positions in positions_by_scheme.items():
         try:
-            unit_code = self.data['code']
-        except KeyError:
-            raise ValidationError({'code': 'Code is required'})
-        with open('standarts/unit_codes_all.json', 'r') as json_file:
-            unit_codes_all = json.loads(json_file.read())
+            check_scheme(scheme)
+        except ValidationError as exc:
+            for position in positions:
+                results[position] = {'valid': False, 'errors': exc.detail}
+            continue
+
+        if scheme not in STANDART_CLASSIFICATION_REFERENCE_SCHEMES:
+            for position in positions:
+                results[position] = {'valid': True}
+            continue
+
+        classification_codes = registry.get_classifiers(scheme)
+        for position in positions:
             try:
-                unit_code = unit_codes_all[self.data['code']]
-            except KeyError:
-                raise ValidationError({'code': 'Wrong code'})
-        self.data['name'] = unit_code['name']
-        return self.data
+                description = get_classification_description(
+                    classification_codes, classifications[position]['id']
+                )
+            except ValidationError as exc:
+                results[position] = {'valid': False, 'errors': exc.detail}
+            else:
+                results[position] = {'valid': True, 'description': description}
 
-    def validate_classifiers(self):
-        scheme = self.data['scheme']
-        try:
-            reference_filename = CLASSIFICATION_REFERENCE_MAPPING[scheme]
-        except KeyError:
-            raise ValidationError({'scheme': 'Unknown scheme'})
+    return [
+        dict(classification, **result)
+        for classification, result in zip(classifications, results)
+    ]
 
-        if scheme in STANDART_CLASSIFICATION_REFERENCE_SCHEMES:
-            self._validate_classifiers_by_standarts_default(reference_filename)
 
-        return self.data
+def validate_units_batch(unit_codes):
+    """Checks list of unit codes, returns result for every code"""
+    units = registry.get_units()
+    results = []
+    for unit_code in unit_codes:
+        try:
+            name = get_unit_name(units, unit_code)
+        except ValidationError as exc:
+            results.append(
+                {'code': unit_code, 'valid': False, 'errors': exc.detail}
+            )
+        else:
+            results.append({'code': unit_code, 'valid': True, 'name': name})
+    return results
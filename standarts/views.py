@@ -0,0 +1,70 @@
+from django.http import Http404
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from standarts.registry import CLASSIFICATION_REFERENCE_MAPPING, registry
+from standarts.serializers import ReferenceValidationSerializer
+from standarts.validators import (
+    validate_classifiers_batch, validate_units_batch
+)
+
+
+class ClassifierSearchView(APIView):
+    """
+    Autocomplete for classifier codes and descriptions.
+    Returns up to `limit` items which id or description words
+    start with words passed in `q` query parameter.
+    Items which id starts with `q` go first (exact match first),
+    other items are not ranked by relevance
+    """
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 100
+
+    permission_classes = (IsAuthenticated, )
+
+    def get_limit(self, request):
+        limit = request.query_params.get('limit', self.DEFAULT_LIMIT)
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ValidationError({'limit': 'Provide a valid number'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Provide a positive number'})
+        return min(limit, self.MAX_LIMIT)
+
+    def get(self, request, scheme):
+        if scheme not in CLASSIFICATION_REFERENCE_MAPPING:
+            raise Http404
+        search_index = registry.get_search_index(scheme)
+        results = search_index.search(
+            request.query_params.get('q', ''), limit=self.get_limit(request)
+        )
+        return Response({
+            'results': [
+                {'id': code, 'scheme': scheme, 'description': description}
+                for code, description in results
+            ]
+        })
+
+
+class ReferenceValidationView(APIView):
+    """
+    Batch check of classifications and unit codes against reference data.
+    Accepts {"classifications": [{"scheme": ..., "id": ...}], "units": [...]}
+    and returns result for every passed item
+    """
+    permission_classes = (IsAuthenticated, )
+
+    def post(self, request):
+        serializer = ReferenceValidationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({
+            'classifications': validate_classifiers_batch(
+                serializer.validated_data.get('classifications', [])
+            ),
+            'units': validate_units_batch(
+                serializer.validated_data.get('units', [])
+            ),
+        })